@@ -0,0 +1,230 @@
+"""
+Benchmark Suite
+
+Times the pipeline's hot paths on synthetic corpora and compares them to a stored
+baseline. Runs offline on a CPU-only machine; benchmarks whose libraries or models
+are not installed are reported as skipped.
+
+Usage (from the repository root):
+    python -m benchmarks.run_benchmarks                      # compare to the baseline
+    python -m benchmarks.run_benchmarks --save-baseline      # record a new baseline
+    python -m benchmarks.run_benchmarks --scale medium --only clean_sentence
+
+Exits with status 1 if any benchmark is slower than its baseline by more than
+--threshold (default 25%). Baselines are machine-specific, so record one on the
+machine you compare on.
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import platform
+import statistics
+import tempfile
+import subprocess
+import pandas as pd
+from benchmarks import synthetic
+
+
+SCALES = {
+    "small": {"sentences": 5_000, "documents": 20, "abstracts": 500, "pdfs": 3},
+    "medium": {"sentences": 50_000, "documents": 200, "abstracts": 5_000, "pdfs": 20},
+    "large": {"sentences": 500_000, "documents": 2_000, "abstracts": 50_000, "pdfs": 100},
+}
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), "baseline.json")
+
+STATS_CONFIG = {
+    "chunk_size": 10_000,
+    "duplicate_mode": "exact",
+    "hll_precision": 14,
+    "bloom_bits": 16_777_216,
+    "bloom_hashes": 7,
+}
+
+
+def bench_reconstruct_abstract(scale, seed, workdir):
+    from data_pipeline.collect_metadata import reconstruct_abstract
+
+    indexes = synthetic.make_inverted_indexes(scale["abstracts"], "sw", seed)
+    return lambda: [reconstruct_abstract(index) for index in indexes]
+
+
+def bench_clean_sentence(scale, seed, workdir):
+    from data_pipeline.extract_sentences import clean_sentence, is_valid_sentence
+
+    rng = random.Random(seed)
+    sentences = [
+        f"## **{sentence}** [{idx}] (x)  \n"
+        for idx, sentence in enumerate(
+            synthetic.make_sentences(scale["sentences"], rng.choice(["th", "ta"]), seed)
+        )
+    ]
+    return lambda: [is_valid_sentence(clean_sentence(s)) for s in sentences]
+
+
+def bench_clean_markdown(scale, seed, workdir):
+    from data_pipeline.extract_sentences import clean_markdown
+
+    documents = synthetic.make_markdown_documents(scale["documents"], "vi", seed)
+    return lambda: [clean_markdown(document) for document in documents]
+
+
+def bench_extract_document_sentences(scale, seed, workdir):
+    from data_pipeline.extract_sentences import extract_document_sentences, load_models
+
+    nlp, detector = load_models()
+    documents = synthetic.make_markdown_documents(
+        max(scale["documents"] // 10, 1), "et", seed
+    )
+    return lambda: [
+        extract_document_sentences(document, "et", nlp, detector)
+        for document in documents
+    ]
+
+
+def bench_convert_pdf(scale, seed, workdir):
+    from data_pipeline.convert_pdfs import convert_pdf, load_detector
+
+    detector = load_detector()
+    pdf_paths = []
+    for idx in range(scale["pdfs"]):
+        lang_code = synthetic.PDF_LANGUAGES[idx % len(synthetic.PDF_LANGUAGES)]
+        pdf_path = os.path.join(workdir, f"{idx:04d}.pdf")
+        synthetic.write_pdf(pdf_path, lang_code, seed)
+        pdf_paths.append((pdf_path, lang_code))
+    return lambda: [convert_pdf(path, lang, detector) for path, lang in pdf_paths]
+
+
+def bench_summarize_file(scale, seed, workdir, duplicate_mode="exact"):
+    from data_pipeline.generate_statistics import summarize_file
+
+    file_path = os.path.join(workdir, f"bn_sentences_{duplicate_mode}.jsonl")
+    synthetic.write_sentences_jsonl(file_path, scale["sentences"], "bn", seed)
+    stats_config = {**STATS_CONFIG, "duplicate_mode": duplicate_mode}
+    return lambda: summarize_file(file_path, stats_config)
+
+
+def bench_summarize_file_approximate(scale, seed, workdir):
+    return bench_summarize_file(scale, seed, workdir, "approximate")
+
+
+def bench_startup(code: str):
+    """Time a fresh interpreter running code from the repository root."""
+    repo_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    command = [sys.executable, "-c", code]
+    return lambda: subprocess.run(command, cwd=repo_root, check=True)
+
+
+def bench_startup_main(scale, seed, workdir):
+    return bench_startup("import main; main.load_config()")
+
+
+def bench_startup_statistics(scale, seed, workdir):
+    return bench_startup("import main; main.stage_module('generate_statistics')")
+
+
+BENCHMARKS = {
+    "startup_main": bench_startup_main,
+    "startup_statistics": bench_startup_statistics,
+    "reconstruct_abstract": bench_reconstruct_abstract,
+    "clean_sentence": bench_clean_sentence,
+    "clean_markdown": bench_clean_markdown,
+    "extract_document_sentences": bench_extract_document_sentences,
+    "convert_pdf": bench_convert_pdf,
+    "summarize_file": bench_summarize_file,
+    "summarize_file_approximate": bench_summarize_file_approximate,
+}
+
+
+def time_function(func, repeat: int):
+    """Run a function repeatedly and return its timings in seconds."""
+    func()  # warm up caches and lazy imports
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def machine_info():
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "processor": platform.processor(),
+        "cpu_count": os.cpu_count(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark pipeline hot paths")
+    parser.add_argument("--scale", choices=list(SCALES), default="small")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--only", nargs="+", choices=list(BENCHMARKS))
+    parser.add_argument("--threshold", type=float, default=0.25)
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--save-baseline", action="store_true")
+    args = parser.parse_args()
+
+    baseline = {"machine": machine_info(), "results": {}}
+    if os.path.exists(args.baseline):
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+    scale_baseline = baseline["results"].get(args.scale, {})
+
+    results = []
+    regressions = []
+    with tempfile.TemporaryDirectory() as workdir:
+        for name in args.only or BENCHMARKS:
+            try:
+                func = BENCHMARKS[name](SCALES[args.scale], args.seed, workdir)
+                timings = time_function(func, args.repeat)
+            except (ImportError, OSError, subprocess.CalledProcessError) as e:
+                results.append({"Benchmark": name, "Status": f"skipped ({e})"})
+                continue
+
+            best = min(timings)
+            result = {
+                "Benchmark": name,
+                "Best (s)": round(best, 4),
+                "Median (s)": round(statistics.median(timings), 4),
+                "Status": "ok",
+            }
+
+            previous = scale_baseline.get(name)
+            if previous:
+                change = best / previous - 1
+                result["Baseline (s)"] = round(previous, 4)
+                result["Change"] = f"{change * 100:+.1f}%"
+                if change > args.threshold and not args.save_baseline:
+                    result["Status"] = "REGRESSION"
+                    regressions.append(name)
+            if args.save_baseline:
+                scale_baseline[name] = best
+            results.append(result)
+
+    print(f"Benchmark Results ({args.scale}, best of {args.repeat}):")
+    print(pd.DataFrame(results).fillna("").to_string(index=False))
+
+    if args.save_baseline:
+        baseline["machine"] = machine_info()
+        baseline["results"][args.scale] = scale_baseline
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(baseline, f, indent=2, sort_keys=True)
+        print(f"\nSaved baseline to {args.baseline}")
+
+    if regressions:
+        print(
+            f"\n{len(regressions)} benchmark(s) regressed by more than "
+            f"{args.threshold * 100:.0f}%: {', '.join(regressions)}"
+        )
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
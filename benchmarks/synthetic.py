@@ -0,0 +1,109 @@
+"""
+Synthetic Corpora
+
+Deterministic generators for the inputs the pipeline's hot paths consume: multilingual
+sentences, sentence JSONL files, markdown documents, OpenAlex inverted-index abstracts
+and PDFs. Everything is built from a seed, so benchmark inputs are identical across
+runs and machines, and nothing touches the network.
+"""
+
+import os
+import random
+from data_pipeline import record_io
+
+
+# Small per-language vocabularies covering the scripts of the configured languages
+VOCABULARY = {
+    "vi": "nghiên cứu kết quả phương pháp dữ liệu phân tích mô hình thực nghiệm hệ thống".split(),
+    "ta": "ஆய்வு முடிவு முறை தரவு பகுப்பாய்வு மாதிரி சோதனை அமைப்பு".split(),
+    "bn": "গবেষণা ফলাফল পদ্ধতি তথ্য বিশ্লেষণ মডেল পরীক্ষা ব্যবস্থা".split(),
+    "th": "การวิจัย ผลลัพธ์ วิธีการ ข้อมูล การวิเคราะห์ แบบจำลอง การทดลอง ระบบ".split(),
+    "sw": "utafiti matokeo mbinu data uchambuzi mfano majaribio mfumo".split(),
+    "et": "uuring tulemus meetod andmed analüüs mudel katse süsteem".split(),
+}
+
+# Languages whose script the default PDF font (Helvetica) can render
+PDF_LANGUAGES = ("vi", "sw", "et")
+
+
+def make_sentence(rng: random.Random, lang_code: str, min_words=3, max_words=60) -> str:
+    words = VOCABULARY[lang_code]
+    length = rng.randint(min_words, max_words)
+    return " ".join(rng.choice(words) for _ in range(length)) + "."
+
+
+def make_sentences(n: int, lang_code: str, seed: int, duplicate_rate: float = 0.02):
+    """Generate sentences with a controlled share of exact duplicates."""
+    rng = random.Random(f"{seed}:{lang_code}")
+    sentences = []
+    for _ in range(n):
+        if sentences and rng.random() < duplicate_rate:
+            sentences.append(rng.choice(sentences))
+        else:
+            sentences.append(make_sentence(rng, lang_code))
+    return sentences
+
+
+def write_sentences_jsonl(path: str, n: int, lang_code: str, seed: int, per_doc: int = 40):
+    """Write a sentence file in the format extract_sentences produces."""
+    with record_io.RecordWriter(path) as f:
+        for idx, sentence in enumerate(make_sentences(n, lang_code, seed)):
+            data = {
+                "text": sentence,
+                "lang": lang_code,
+                "doc_id": f"{idx // per_doc:04d}_{seed:08x}",
+                "sent_id": idx % per_doc,
+            }
+            f.write(data)
+
+
+def make_markdown(rng: random.Random, lang_code: str, paragraphs: int = 20) -> str:
+    """Generate a markdown document with the noise pymupdf4llm output contains."""
+    parts = [f"# **{make_sentence(rng, lang_code, 2, 6)}**"]
+    for idx in range(paragraphs):
+        if idx % 5 == 0:
+            parts.append(f"## {make_sentence(rng, lang_code, 2, 5)}")
+        if idx % 7 == 3:
+            parts.append("| a | b |\n|---|---|\n| 1 | 2 |")
+        if idx % 9 == 4:
+            parts.append("```\nx = [1, 2, 3]\n```")
+        sentences = [make_sentence(rng, lang_code) for _ in range(rng.randint(3, 8))]
+        if idx % 4 == 1:
+            sentences.append(f"See https://example.org/paper/{idx} [{idx}] (**{idx}**).")
+        parts.append("  ".join(sentences))
+    return "\n\n".join(parts)
+
+
+def make_markdown_documents(n: int, lang_code: str, seed: int):
+    rng = random.Random(f"{seed}:{lang_code}:markdown")
+    return [make_markdown(rng, lang_code) for _ in range(n)]
+
+
+def make_inverted_index(rng: random.Random, lang_code: str, words: int = 250) -> dict:
+    """Generate an OpenAlex abstract_inverted_index."""
+    inverted_index = {}
+    for position in range(words):
+        word = rng.choice(VOCABULARY[lang_code])
+        inverted_index.setdefault(word, []).append(position)
+    return inverted_index
+
+
+def make_inverted_indexes(n: int, lang_code: str, seed: int):
+    rng = random.Random(f"{seed}:{lang_code}:abstracts")
+    return [make_inverted_index(rng, lang_code, rng.randint(80, 400)) for _ in range(n)]
+
+
+def write_pdf(path: str, lang_code: str, seed: int, pages: int = 3) -> None:
+    """Write a text PDF with PyMuPDF, its content depending only on the file name."""
+    import pymupdf
+
+    rng = random.Random(f"{seed}:{lang_code}:{os.path.basename(path)}")
+    with pymupdf.open() as doc:
+        for _ in range(pages):
+            page = doc.new_page()
+            text = "\n\n".join(
+                " ".join(make_sentence(rng, lang_code) for _ in range(4))
+                for _ in range(6)
+            )
+            page.insert_textbox(page.rect + (50, 50, -50, -50), text, fontsize=10)
+        doc.save(path)
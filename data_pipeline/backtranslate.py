@@ -7,10 +7,10 @@ for processing, and formats the results into parallel corpus files.
 """
 
 import os
-import json
 import time
 from openai import OpenAI
-from utils import load_config
+from utils import load_config, select_languages
+from data_pipeline import instrumentation, record_io
 from dotenv import load_dotenv
 
 
@@ -32,14 +32,13 @@ def create_batch_query_files(config: dict) -> None:
         lang_sents_file = f"{sents_dir}/{lang_code}_sentences.jsonl"
         lang_queries_file = f"{api_queries_dir}/{lang_code}_queries.jsonl"
 
-        with open(lang_sents_file, "r", encoding="utf-8") as file:
-            lang_sents = [json.loads(line) for line in file]
-
-        if not lang_sents:
+        if not os.path.exists(lang_sents_file):
+            continue
+        if not record_io.count_records(lang_sents_file):
             continue
 
-        with open(lang_queries_file, "w", encoding="utf-8") as out_file:
-            for idx, sent in enumerate(lang_sents):
+        with record_io.RecordWriter(lang_queries_file) as out_file:
+            for idx, sent in enumerate(record_io.iter_records(lang_sents_file)):
                 query_id = f"{lang_code}_{idx}"
                 messages = [
                     {"role": "system", "content": system_prompt},
@@ -60,7 +59,7 @@ def create_batch_query_files(config: dict) -> None:
                         "max_tokens": max_tokens,
                     },
                 }
-                out_file.write(json.dumps(query, ensure_ascii=False) + "\n")
+                out_file.write(query)
 
     print("Batch query files created successfully!")
 
@@ -108,7 +107,7 @@ def check_batch_status(client: OpenAI, batch_info: dict) -> dict:
 
 def retrieve_and_create_parallel_data(
     config: dict, client: OpenAI, batch_info: dict
-) -> None:
+) -> dict:
     """Step 4: Retrieve results and create parallel data files."""
 
     sents_dir = config["directory"]["SENTENCES_DIR"]
@@ -120,61 +119,62 @@ def retrieve_and_create_parallel_data(
         if batch.output_file_id:
             file_response = client.files.content(batch.output_file_id)
             batch_responses[key] = [
-                json.loads(res) for res in file_response.text.split("\n") if res
+                record_io.loads(res) for res in file_response.text.split("\n") if res
             ]
 
     # Create parallel data files
+    pair_counts = {}
     for lang_code, _ in config["LANGUAGES"].items():
         lang_sents_file = f"{sents_dir}/{lang_code}_sentences.jsonl"
         parallel_sents_file = f"{parallel_data_dir}/{lang_code}-en_data.jsonl"
 
-        with open(lang_sents_file, "r", encoding="utf-8") as file:
-            lang_sents = [json.loads(line) for line in file]
-
-        if not lang_sents:
+        if not os.path.exists(lang_sents_file):
             continue
 
         if lang_code not in batch_responses.keys():
             continue
 
-        # Extract translations
-        translated_sentences = [
-            res["response"]["body"]["choices"][0]["message"]["content"]
+        # Extract translations, keyed by query id since batch output is unordered
+        translated_sentences = {
+            res["custom_id"]: res["response"]["body"]["choices"][0]["message"][
+                "content"
+            ]
             for res in batch_responses[lang_code]
-        ]
+        }
+        num_sents = record_io.count_records(lang_sents_file)
 
-        assert len(translated_sentences) == len(lang_sents), (
-            f"Mismatch: {len(translated_sentences)} translations vs {len(lang_sents)} source sentences"
+        assert len(translated_sentences) == num_sents, (
+            f"Mismatch: {len(translated_sentences)} translations vs {num_sents} source sentences"
         )
 
         # Write parallel data
-        with open(parallel_sents_file, "w", encoding="utf-8") as outfile:
-            for target, source in zip(lang_sents, translated_sentences):
+        with record_io.RecordWriter(parallel_sents_file, build_index=True) as outfile:
+            for idx, target in enumerate(record_io.iter_records(lang_sents_file)):
                 outfile.write(
-                    json.dumps(
-                        {
-                            "target_text": target["text"],
-                            "target_lang": lang_code,
-                            "source_text": source,
-                            "source_lang": "en",
-                            "doc_id": target["doc_id"],
-                            "sent_id": target["sent_id"],
-                        },
-                        ensure_ascii=False,
-                    )
-                    + "\n"
+                    {
+                        "target_text": target["text"],
+                        "target_lang": lang_code,
+                        "source_text": translated_sentences[f"{lang_code}_{idx}"],
+                        "source_lang": "en",
+                        "doc_id": target["doc_id"],
+                        "sent_id": target["sent_id"],
+                    }
                 )
 
+        pair_counts[lang_code] = len(translated_sentences)
         print(
             f"Created parallel data for {lang_code}: {len(translated_sentences)} sentence pairs"
         )
 
     print("\nParallel data creation complete!")
+    return pair_counts
 
 
-def main():
+@instrumentation.instrumented("backtranslate")
+def main(lang_codes=None):
     load_dotenv()
-    config = load_config()
+    config = select_languages(load_config(), lang_codes)
+    timer = instrumentation.Timer()
 
     create_batch_query_files(config)
 
@@ -188,4 +188,6 @@ def main():
         done = all(batch == "completed" for batch in statuses)
         time.sleep(30)
 
-    retrieve_and_create_parallel_data(config, client, batch_info)
+    pair_counts = retrieve_and_create_parallel_data(config, client, batch_info)
+    for lang_code, num_pairs in pair_counts.items():
+        instrumentation.record_language("backtranslate", lang_code, timer, items=num_pairs)
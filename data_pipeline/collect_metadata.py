@@ -8,10 +8,10 @@ articles in the configured languages.
 
 import time
 import random
-import requests
 import pandas as pd
 from tqdm import tqdm
-from utils import load_config
+from utils import load_config, select_languages
+from data_pipeline import instrumentation, dedup_index
 
 
 def reconstruct_abstract(inverted_index):
@@ -28,7 +28,9 @@ def reconstruct_abstract(inverted_index):
 
 
 def download_metadata(lang_code: str, max_articles: int, config: dict):
-    """Download article metadata from OpenAlex API."""
+    """Download article metadata from OpenAlex API, skipping duplicate articles."""
+    import requests
+
     url = "https://api.openalex.org/works"
     params = {
         "filter": f"language:{lang_code},type:article",
@@ -39,8 +41,11 @@ def download_metadata(lang_code: str, max_articles: int, config: dict):
     }
 
     session = requests.Session()
+    index = dedup_index.load_index(config)
+    seen = set()
     article_data = []
     total_articles = 0
+    duplicate_count = 0
 
     with tqdm(
         total=max_articles,
@@ -64,6 +69,13 @@ def download_metadata(lang_code: str, max_articles: int, config: dict):
                     if not pdf_url:
                         continue
 
+                    # Skip works this or another language already collected
+                    keys = dedup_index.article_keys(result["doi"], pdf_url)
+                    if index.is_duplicate(keys, lang_code, seen):
+                        duplicate_count += 1
+                        continue
+                    seen.update(keys)
+
                     abstract = reconstruct_abstract(result["abstract_inverted_index"])
 
                     article_data.append(
@@ -91,24 +103,40 @@ def download_metadata(lang_code: str, max_articles: int, config: dict):
     output_dir = config["directory"]["METADATA_DIR"]
     metadata_path = f"{output_dir}/{lang_code}_article_data.csv"
     df.to_csv(metadata_path, index=False, encoding="utf-8")
-    return df
+    dedup_index.register_language(config, lang_code, df, duplicate_count)
+    return df, duplicate_count
 
 
-def main():
-    config = load_config()
+@instrumentation.instrumented("collect_metadata")
+def main(lang_codes=None):
+    config = select_languages(load_config(), lang_codes)
     metadata_stats = []
 
     for lang_code, lang_config in config["LANGUAGES"].items():
-        df = download_metadata(lang_code, lang_config["max_articles"], config)
+        timer = instrumentation.Timer()
+        df, duplicate_count = download_metadata(
+            lang_code, lang_config["max_articles"], config
+        )
+        instrumentation.record_language(
+            "collect_metadata",
+            lang_code,
+            timer,
+            items=len(df),
+            with_abstracts=df["abstract"].notna().sum() if len(df) else 0,
+            duplicates=duplicate_count,
+        )
         metadata_stats.append(
             {
                 "Language": lang_config["name"],
                 "Code": lang_code,
                 "Articles": len(df),
-                "With Abstracts": df["abstract"].notna().sum(),
+                "With Abstracts": df["abstract"].notna().sum() if len(df) else 0,
+                "Duplicates Skipped": duplicate_count,
             }
         )
 
+    total_duplicates = sum(stats["Duplicates Skipped"] for stats in metadata_stats)
     print("Metadata Collection Summary:")
     print(pd.DataFrame(metadata_stats))
+    print(f"Skipped {total_duplicates} articles already collected")
     print()
@@ -8,12 +8,10 @@ keeping only those in the target language.
 
 import os
 import hashlib
-import pymupdf
-import pymupdf4llm
 import pandas as pd
 from tqdm import tqdm
-from utils import load_config
-from lingua import LanguageDetectorBuilder
+from utils import load_config, select_languages
+from data_pipeline import instrumentation
 
 
 def detect_language(text: str, detector):
@@ -22,10 +20,54 @@ def detect_language(text: str, detector):
     return result.iso_code_639_1.name.lower() if result else None
 
 
-def main():
-    config = load_config()
+def load_detector():
+    """Build the language detector (lingua is imported here to keep imports light)."""
+    from lingua import LanguageDetectorBuilder
+
+    return LanguageDetectorBuilder.from_all_languages().build()
+
+
+def convert_pdf(pdf_path: str, lang_code: str, detector):
+    """Convert a PDF to markdown, returning None if it is not in the target language."""
+    import pymupdf
+    import pymupdf4llm
+
+    with pymupdf.open(pdf_path) as doc:
+        md_text = pymupdf4llm.to_markdown(doc)
+
+    detected_code = detect_language(md_text, detector)
+    return md_text if detected_code == lang_code else None
+
+
+def document_id(md_text: str, doc_number: int) -> str:
+    """Return the doc_id of a kept document: its counter and a hash of its markdown."""
+    content_hash = hashlib.md5(md_text.encode("utf-8")).hexdigest()[:8]
+    return f"{doc_number:04d}_{content_hash}"
+
+
+def save_document(
+    md_text: str,
+    pdf_path: str,
+    doc_number: int,
+    lang_pdf_dir: str,
+    lang_extracted_dir: str,
+) -> str:
+    """Rename a kept PDF and save its markdown with counter + hash, returning the doc_id."""
+    doc_id = document_id(md_text, doc_number)
+
+    os.rename(pdf_path, os.path.join(lang_pdf_dir, f"{doc_id}.pdf"))
+    with open(
+        os.path.join(lang_extracted_dir, f"{doc_id}.md"), "w", encoding="utf-8"
+    ) as f:
+        f.write(md_text)
+    return doc_id
+
+
+@instrumentation.instrumented("convert_pdfs")
+def main(lang_codes=None):
+    config = select_languages(load_config(), lang_codes)
     processing_stats = []
-    detector = LanguageDetectorBuilder.from_all_languages().build()
+    detector = load_detector()
 
     for lang_code, lang_config in config["LANGUAGES"].items():
         lang_pdf_dir = f"{config['directory']['PDFS_DIR']}/{lang_code}"
@@ -35,6 +77,7 @@ def main():
         if not os.path.exists(lang_pdf_dir):
             continue
 
+        timer = instrumentation.Timer()
         pdf_files = list(
             set([path for path in os.listdir(lang_pdf_dir) if path.endswith(".pdf")])
         )
@@ -54,24 +97,13 @@ def main():
                 if not os.path.exists(pdf_path):
                     continue
 
-                with pymupdf.open(pdf_path) as doc:
-                    md_text = pymupdf4llm.to_markdown(doc)
-
                 # Verify language
-                detected_code = detect_language(md_text, detector)
-                if detected_code == lang_code:
+                md_text = convert_pdf(pdf_path, lang_code, detector)
+                if md_text is not None:
                     kept_count += 1
-                    content_hash = hashlib.md5(md_text.encode("utf-8")).hexdigest()[:8]
-
-                    # Rename PDF and save markdown with counter + hash
-                    new_pdf_name = f"{kept_count:04d}_{content_hash}.pdf"
-                    new_pdf_path = os.path.join(lang_pdf_dir, new_pdf_name)
-                    os.rename(pdf_path, new_pdf_path)
-
-                    md_name = f"{kept_count:04d}_{content_hash}.md"
-                    md_path = os.path.join(lang_extracted_dir, md_name)
-                    with open(md_path, "w", encoding="utf-8") as f:
-                        f.write(md_text)
+                    save_document(
+                        md_text, pdf_path, kept_count, lang_pdf_dir, lang_extracted_dir
+                    )
                 else:
                     # Remove PDF if wrong language
                     os.remove(pdf_path)
@@ -82,6 +114,15 @@ def main():
                 os.remove(pdf_path)
                 error_count += 1
 
+        instrumentation.record_language(
+            "convert_pdfs",
+            lang_code,
+            timer,
+            items=len(pdf_files),
+            kept=kept_count,
+            wrong_language=wrong_lang_count,
+            errors=error_count,
+        )
         processing_stats.append(
             {
                 "Language": lang_config["name"],
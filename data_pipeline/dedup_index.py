@@ -0,0 +1,225 @@
+"""
+Article Deduplication Index
+
+This script keeps the normalized DOIs and PDF URLs of the articles collected for
+every language in {METADATA_DIR}/dedup_index.json. OpenAlex often returns the same
+work, or the same PDF, for more than one language filter and across reruns. The
+index assigns each DOI and URL to the first language that collected it, so
+collect_metadata skips articles another language already has and the download
+stages drop any that still reach them. The download stages also append the keys of
+every PDF they fetch to {METADATA_DIR}/downloaded_keys.txt and skip those articles
+on later runs. Each PDF is then downloaded, converted and extracted only once.
+"""
+
+import os
+import json
+import math
+import threading
+from urllib.parse import urlsplit, parse_qsl, urlencode
+
+
+INDEX_VERSION = 1
+
+DOI_PREFIXES = (
+    "https://doi.org/",
+    "http://doi.org/",
+    "https://dx.doi.org/",
+    "http://dx.doi.org/",
+    "doi:",
+)
+
+# Query parameters that identify a visit rather than a document
+TRACKING_PARAMS = {"fbclid", "gclid", "mc_cid", "mc_eid"}
+
+_lock = threading.Lock()
+
+
+def is_missing(value) -> bool:
+    if value is None or (isinstance(value, float) and math.isnan(value)):
+        return True
+    return not str(value).strip()
+
+
+def normalize_doi(doi):
+    """Return a lowercased DOI without resolver prefix, or None."""
+    if is_missing(doi):
+        return None
+    doi = str(doi).strip().lower()
+    for prefix in DOI_PREFIXES:
+        if doi.startswith(prefix):
+            doi = doi[len(prefix) :]
+            break
+    return doi or None
+
+
+def normalize_url(url):
+    """Return a URL key that ignores scheme, www, fragments, tracking parameters and trailing slashes."""
+    if is_missing(url):
+        return None
+    url = str(url).strip()
+    try:
+        parts = urlsplit(url)
+        port = parts.port
+    except ValueError:
+        return url
+
+    host = (parts.hostname or "").lower()
+    if host.startswith("www."):
+        host = host[len("www.") :]
+    if port and port not in (80, 443):
+        host = f"{host}:{port}"
+
+    query = urlencode(
+        sorted(
+            (key, value)
+            for key, value in parse_qsl(parts.query, keep_blank_values=True)
+            if key.lower() not in TRACKING_PARAMS and not key.lower().startswith("utm_")
+        )
+    )
+    key = f"{host}{parts.path.rstrip('/')}"
+    return f"{key}?{query}" if query else key
+
+
+def article_keys(doi, pdf_url):
+    """Return the index keys of an article."""
+    keys = []
+    if normalize_doi(doi):
+        keys.append(f"doi:{normalize_doi(doi)}")
+    if normalize_url(pdf_url):
+        keys.append(f"url:{normalize_url(pdf_url)}")
+    return keys
+
+
+def article_rows(articles_df):
+    """Return the (doi, pdf_url) pairs of a metadata table, which may lack a doi column."""
+    dois = articles_df["doi"] if "doi" in articles_df else [None] * len(articles_df)
+    return zip(dois, articles_df["pdf_url"])
+
+
+def index_path(config: dict) -> str:
+    return f"{config['directory']['METADATA_DIR']}/dedup_index.json"
+
+
+def downloaded_path(config: dict) -> str:
+    return f"{config['directory']['METADATA_DIR']}/downloaded_keys.txt"
+
+
+class DedupIndex:
+    """Owner language of every DOI and PDF URL collected so far."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.owners = {}
+        self.skipped = {}
+
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                index = json.load(f)
+            if index.get("version") == INDEX_VERSION:
+                self.owners = index["owners"]
+                self.skipped = index["skipped"]
+
+    def is_duplicate(self, keys, lang_code: str, seen: set) -> bool:
+        """Check whether an article repeats an earlier one or belongs to another language."""
+        return any(
+            key in seen or self.owners.get(key, lang_code) != lang_code for key in keys
+        )
+
+    def filter_articles(self, articles_df, lang_code: str, downloaded=frozenset()):
+        """Drop duplicate and already downloaded articles.
+
+        Returns the kept rows, the number of duplicates and the number of articles
+        whose PDF an earlier run already downloaded.
+        """
+        if articles_df.empty:
+            return articles_df, 0, 0
+
+        seen = set()
+        keep = []
+        duplicate_count = 0
+        downloaded_count = 0
+        for doi, pdf_url in article_rows(articles_df):
+            keys = article_keys(doi, pdf_url)
+            if self.is_duplicate(keys, lang_code, seen):
+                duplicate_count += 1
+                keep.append(False)
+                continue
+            seen.update(keys)
+            if any(key in downloaded for key in keys):
+                downloaded_count += 1
+                keep.append(False)
+                continue
+            keep.append(True)
+
+        kept_df = articles_df[keep].reset_index(drop=True)
+        return kept_df, duplicate_count, downloaded_count
+
+    def register(self, lang_code: str, articles_df, skipped: int) -> None:
+        """Replace the articles a language owns, keeping keys other languages own."""
+        self.owners = {
+            key: owner for key, owner in self.owners.items() if owner != lang_code
+        }
+        if not articles_df.empty:
+            for doi, pdf_url in article_rows(articles_df):
+                for key in article_keys(doi, pdf_url):
+                    self.owners.setdefault(key, lang_code)
+        self.skipped[lang_code] = skipped
+
+    def save(self) -> None:
+        index = {
+            "version": INDEX_VERSION,
+            "owners": self.owners,
+            "skipped": self.skipped,
+        }
+        with open(f"{self.path}.tmp", "w", encoding="utf-8") as f:
+            json.dump(index, f)
+        os.replace(f"{self.path}.tmp", self.path)
+
+
+def load_index(config: dict) -> DedupIndex:
+    return DedupIndex(index_path(config))
+
+
+def register_language(config: dict, lang_code: str, articles_df, skipped: int) -> None:
+    """Record a language's collected articles in the index on disk."""
+    with _lock:
+        index = load_index(config)
+        index.register(lang_code, articles_df, skipped)
+        index.save()
+
+
+def load_downloaded(config: dict) -> set:
+    """Return the keys of every article whose PDF has been downloaded."""
+    path = downloaded_path(config)
+    if not os.path.exists(path):
+        return set()
+    with open(path, "r", encoding="utf-8") as f:
+        return {line.rstrip("\n") for line in f if line.strip()}
+
+
+def mark_downloaded(config: dict, doi, pdf_url) -> None:
+    """Record that an article's PDF was downloaded, so later runs skip it."""
+    keys = article_keys(doi, pdf_url)
+    if not keys:
+        return
+    with _lock:
+        with open(downloaded_path(config), "a", encoding="utf-8") as f:
+            f.write("".join(f"{key}\n" for key in keys))
+
+
+def filter_metadata(config: dict, lang_code: str, articles_df):
+    """Drop duplicate and already downloaded articles before download.
+
+    Returns the kept rows and the number of articles dropped for each reason, plus
+    the number collect_metadata already skipped, which is reported on its own since
+    those articles never reached the metadata table.
+    """
+    index = load_index(config)
+    articles_df, duplicate_count, downloaded_count = index.filter_articles(
+        articles_df, lang_code, load_downloaded(config)
+    )
+    return articles_df, {
+        "duplicates": duplicate_count,
+        "already_downloaded": downloaded_count,
+        "skipped_at_collection": index.skipped.get(lang_code, 0),
+    }
@@ -0,0 +1,477 @@
+"""
+Distributed Work Leases
+
+This script splits the documents of convert_pdfs and extract_sentences between any
+number of worker processes, on one machine or on several machines sharing the data
+directory. Workers claim one document at a time by creating a lease file with
+O_CREAT | O_EXCL, keep it alive with a heartbeat thread that touches its
+modification time, and write the document's result before marking it done. A lease
+that has not been touched for lease_timeout seconds belongs to a crashed worker and
+is taken over by the next worker that finds it.
+
+Results are written atomically and depend only on the document, so a document that
+is processed twice after a takeover only costs time. Once every document is done, a
+merge step combines the results in sorted document order, so the output does not
+depend on which worker handled which document. Work state is kept in
+{DATA_DIR}/work/<stage>/<lang> until the merge, so an interrupted run resumes where
+it stopped.
+
+Usage:
+    python -m data_pipeline.distributed launch convert_pdfs --workers 4
+    python -m data_pipeline.distributed prepare extract_sentences --langs vi ta
+    python -m data_pipeline.distributed worker extract_sentences     # on each host
+    python -m data_pipeline.distributed merge extract_sentences
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import socket
+import argparse
+import threading
+import subprocess
+import pandas as pd
+from utils import load_config, select_languages
+from data_pipeline import instrumentation, record_io
+from data_pipeline import convert_pdfs, extract_sentences
+
+
+WORKER_ID = f"{socket.gethostname()}_{os.getpid()}"
+
+
+def work_paths(config: dict, stage_name: str, lang_code: str) -> dict:
+    """Return the shared work directory layout of one stage and language."""
+    root = f"{config['directory']['DATA_DIR']}/work/{stage_name}/{lang_code}"
+    return {
+        "root": root,
+        "items": f"{root}/items.json",
+        "leases": f"{root}/leases",
+        "done": f"{root}/done",
+        "results": f"{root}/results",
+    }
+
+
+def write_atomic(path: str, text: str) -> None:
+    """Write a file under a temporary name and rename it into place."""
+    tmp_path = f"{path}.{WORKER_ID}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(text)
+    os.replace(tmp_path, path)
+
+
+def lease_expired(lease_path: str, lease_timeout: float) -> bool:
+    return time.time() - os.stat(lease_path).st_mtime > lease_timeout
+
+
+def claim(lease_path: str, lease_timeout: float) -> bool:
+    """Create an item's lease, taking over the lease if its heartbeat has expired."""
+    for _ in range(3):
+        try:
+            fd = os.open(lease_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+        except FileExistsError:
+            try:
+                if not lease_expired(lease_path, lease_timeout):
+                    return False
+                # Only one worker can rename the expired lease away
+                stale_path = f"{lease_path}.{WORKER_ID}.stale"
+                os.rename(lease_path, stale_path)
+            except FileNotFoundError:
+                continue
+
+            # The lease was renewed or re-claimed in the meantime: put it back
+            if not lease_expired(stale_path, lease_timeout):
+                try:
+                    os.link(stale_path, lease_path)
+                except FileExistsError:
+                    pass
+                os.remove(stale_path)
+                return False
+            os.remove(stale_path)
+            continue
+
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump({"worker": WORKER_ID, "claimed": time.time()}, f)
+        return True
+    return False
+
+
+def release(lease_path: str) -> None:
+    try:
+        os.remove(lease_path)
+    except FileNotFoundError:
+        pass
+
+
+class Heartbeat(threading.Thread):
+    """Touch the lease a worker holds at a fixed interval."""
+
+    def __init__(self, interval: float):
+        super().__init__(daemon=True)
+        self.interval = interval
+        self.lease_path = None
+        self.lock = threading.Lock()
+        self.stopped = threading.Event()
+
+    def hold(self, lease_path) -> None:
+        with self.lock:
+            self.lease_path = lease_path
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            with self.lock:
+                if self.lease_path is None:
+                    continue
+                try:
+                    os.utime(self.lease_path)
+                except FileNotFoundError:
+                    pass
+
+    def stop(self) -> None:
+        self.stopped.set()
+
+
+def list_pdfs(config: dict, lang_code: str):
+    lang_pdf_dir = f"{config['directory']['PDFS_DIR']}/{lang_code}"
+    if not os.path.exists(lang_pdf_dir):
+        return []
+    return sorted(path for path in os.listdir(lang_pdf_dir) if path.endswith(".pdf"))
+
+
+def convert_item(pdf_name: str, config: dict, lang_code: str, paths: dict, detector):
+    """Convert one PDF, leaving renaming and removal of the PDF to the merge."""
+    pdf_path = f"{config['directory']['PDFS_DIR']}/{lang_code}/{pdf_name}"
+    md_text = convert_pdfs.convert_pdf(pdf_path, lang_code, detector)
+    if md_text is None:
+        return {"status": "wrong_language"}
+
+    write_atomic(f"{paths['results']}/{pdf_name}.md", md_text)
+    return {"status": "kept"}
+
+
+def merge_convert(config: dict, lang_code: str, paths: dict, items, records) -> dict:
+    """Save kept documents with counters assigned in sorted PDF order.
+
+    Documents already saved under their doc_id by an interrupted merge are skipped,
+    so the merge can simply be run again.
+    """
+    lang_pdf_dir = f"{config['directory']['PDFS_DIR']}/{lang_code}"
+    lang_extracted_dir = f"{config['directory']['EXTRACTED_DIR']}/{lang_code}"
+    os.makedirs(lang_extracted_dir, exist_ok=True)
+    counts = {"kept": 0, "wrong_language": 0, "error": 0}
+
+    for pdf_name in items:
+        status = records[pdf_name]["status"]
+        counts[status] += 1
+        pdf_path = os.path.join(lang_pdf_dir, pdf_name)
+
+        if status == "kept":
+            with open(f"{paths['results']}/{pdf_name}.md", "r", encoding="utf-8") as f:
+                md_text = f.read()
+            doc_id = convert_pdfs.document_id(md_text, counts["kept"])
+            if os.path.exists(pdf_path):
+                convert_pdfs.save_document(
+                    md_text, pdf_path, counts["kept"], lang_pdf_dir, lang_extracted_dir
+                )
+            elif os.path.exists(os.path.join(lang_pdf_dir, f"{doc_id}.pdf")):
+                # Renamed by an earlier merge, which may have stopped before the markdown
+                write_atomic(os.path.join(lang_extracted_dir, f"{doc_id}.md"), md_text)
+            else:
+                raise FileNotFoundError(f"Neither {pdf_path} nor {doc_id}.pdf exists")
+        elif os.path.exists(pdf_path):
+            os.remove(pdf_path)
+
+    return {
+        "Total PDFs": len(items),
+        "Kept": counts["kept"],
+        "Wrong Language": counts["wrong_language"],
+        "Errors": counts["error"],
+    }
+
+
+def list_markdown(config: dict, lang_code: str):
+    lang_extracted_dir = f"{config['directory']['EXTRACTED_DIR']}/{lang_code}"
+    if not os.path.exists(lang_extracted_dir):
+        return []
+    return sorted(path for path in os.listdir(lang_extracted_dir) if path.endswith(".md"))
+
+
+def extract_item(markdown_file: str, config: dict, lang_code: str, paths: dict, models):
+    """Extract the sentences of one markdown document into a result file."""
+    nlp, detector = models
+    markdown_path = f"{config['directory']['EXTRACTED_DIR']}/{lang_code}/{markdown_file}"
+    with open(markdown_path, "r", encoding="utf-8") as f:
+        md_text = f.read()
+
+    sentences = extract_sentences.extract_document_sentences(
+        md_text, lang_code, nlp, detector
+    )
+    write_atomic(
+        f"{paths['results']}/{markdown_file}.json",
+        json.dumps(sentences, ensure_ascii=False),
+    )
+    return {"status": "ok", "sentences": len(sentences)}
+
+
+def merge_extract(config: dict, lang_code: str, paths: dict, items, records) -> dict:
+    """Write the sentence file in sorted document order up to the target size."""
+    target_sentences = config["LANGUAGES"][lang_code]["target_sentences"]
+    sents_file = f"{config['directory']['SENTENCES_DIR']}/{lang_code}_sentences.jsonl"
+    total_sentences = 0
+    total_documents = 0
+    error_count = 0
+
+    with record_io.RecordWriter(sents_file, build_index=True) as out_file:
+        for markdown_file in items:
+            if total_sentences >= target_sentences:
+                break
+            if records[markdown_file]["status"] != "ok":
+                error_count += 1
+                continue
+
+            with open(
+                f"{paths['results']}/{markdown_file}.json", "r", encoding="utf-8"
+            ) as f:
+                sentences = json.load(f)[: target_sentences - total_sentences]
+            if sentences:
+                total_documents += 1
+
+            for idx, sentence in enumerate(sentences):
+                out_file.write(
+                    {
+                        "text": sentence,
+                        "lang": lang_code,
+                        "doc_id": markdown_file.split(".")[0],
+                        "sent_id": idx,
+                    }
+                )
+            total_sentences += len(sentences)
+
+    return {
+        "Documents": total_documents,
+        "Sentences": total_sentences,
+        "Errors": error_count,
+    }
+
+
+# Stages that can be distributed: how to list their items, load models once per
+# worker, process one item, and merge all results
+STAGES = {
+    "convert_pdfs": {
+        "items": list_pdfs,
+        "load_models": convert_pdfs.load_detector,
+        "process": convert_item,
+        "merge": merge_convert,
+    },
+    "extract_sentences": {
+        "items": list_markdown,
+        "load_models": extract_sentences.load_models,
+        "process": extract_item,
+        "merge": merge_extract,
+    },
+}
+
+
+def load_items(paths: dict):
+    if not os.path.exists(paths["items"]):
+        return None
+    with open(paths["items"], "r", encoding="utf-8") as f:
+        return json.load(f)["items"]
+
+
+def load_done(paths: dict, items) -> dict:
+    """Return the done records of the finished items."""
+    records = {}
+    for item in items:
+        done_path = f"{paths['done']}/{item}.json"
+        if os.path.exists(done_path):
+            with open(done_path, "r", encoding="utf-8") as f:
+                records[item] = json.load(f)
+    return records
+
+
+def prepare(stage_name: str, lang_codes=None) -> None:
+    """Snapshot each language's items into its work directory, keeping unmerged work."""
+    config = select_languages(load_config(), lang_codes)
+    for lang_code in config["LANGUAGES"]:
+        paths = work_paths(config, stage_name, lang_code)
+        if os.path.exists(paths["items"]):
+            continue
+
+        items = STAGES[stage_name]["items"](config, lang_code)
+        if not items:
+            continue
+        for key in ("leases", "done", "results"):
+            os.makedirs(paths[key], exist_ok=True)
+        write_atomic(paths["items"], json.dumps({"items": items}))
+
+
+def work_on(stage_name: str, config: dict, lang_code: str, models, heartbeat) -> int:
+    """Claim and process items until every item of a language is done."""
+    dist_config = config["distributed"]
+    stage = STAGES[stage_name]
+    paths = work_paths(config, stage_name, lang_code)
+    items = load_items(paths)
+    if not items:
+        return 0
+
+    # Visit items in a per-worker order so workers rarely contend for the same lease
+    order = list(items)
+    random.Random(WORKER_ID).shuffle(order)
+    processed = 0
+
+    while True:
+        pending = [
+            item for item in order if not os.path.exists(f"{paths['done']}/{item}.json")
+        ]
+        if not pending:
+            return processed
+
+        claimed_any = False
+        for item in pending:
+            lease_path = f"{paths['leases']}/{item}.lease"
+            if not claim(lease_path, dist_config["lease_timeout"]):
+                continue
+            # Finished by another worker between listing and claiming
+            if os.path.exists(f"{paths['done']}/{item}.json"):
+                release(lease_path)
+                continue
+
+            claimed_any = True
+            heartbeat.hold(lease_path)
+            try:
+                record = stage["process"](item, config, lang_code, paths, models)
+            except Exception as e:
+                print(f"Error processing {item}: {str(e)}")
+                record = {"status": "error"}
+            finally:
+                heartbeat.hold(None)
+
+            record["worker"] = WORKER_ID
+            write_atomic(f"{paths['done']}/{item}.json", json.dumps(record))
+            release(lease_path)
+            processed += 1
+
+        # Remaining items are leased by live workers: wait for them or their expiry
+        if not claimed_any:
+            time.sleep(dist_config["poll_interval"])
+
+
+@instrumentation.instrumented("distributed_worker")
+def worker(stage_name: str, lang_codes=None) -> None:
+    config = select_languages(load_config(), lang_codes)
+    paths = {
+        lang_code: work_paths(config, stage_name, lang_code)
+        for lang_code in config["LANGUAGES"]
+    }
+    if not any(os.path.exists(p["items"]) for p in paths.values()):
+        print(f"No prepared {stage_name} work found, skipping")
+        return
+
+    models = STAGES[stage_name]["load_models"]()
+    heartbeat = Heartbeat(config["distributed"]["heartbeat_interval"])
+    heartbeat.start()
+    try:
+        for lang_code in config["LANGUAGES"]:
+            timer = instrumentation.Timer()
+            processed = work_on(stage_name, config, lang_code, models, heartbeat)
+            instrumentation.record_language(
+                "distributed_worker", lang_code, timer, items=processed
+            )
+            print(f"Worker {WORKER_ID} processed {processed} {lang_code} item(s)")
+    finally:
+        heartbeat.stop()
+
+
+@instrumentation.instrumented("distributed_merge")
+def merge(stage_name: str, lang_codes=None) -> None:
+    """Merge finished languages and raise if any language still has pending items."""
+    config = select_languages(load_config(), lang_codes)
+    merge_stats = []
+    unfinished = []
+
+    for lang_code, lang_config in config["LANGUAGES"].items():
+        paths = work_paths(config, stage_name, lang_code)
+        items = load_items(paths)
+        if items is None:
+            continue
+
+        records = load_done(paths, items)
+        if len(records) < len(items):
+            unfinished.append(f"{lang_code} ({len(items) - len(records)} pending)")
+            continue
+
+        timer = instrumentation.Timer()
+        stats = STAGES[stage_name]["merge"](config, lang_code, paths, items, records)
+        workers = {record["worker"] for record in records.values()}
+        instrumentation.record_language(
+            "distributed_merge", lang_code, timer, items=len(items), workers=len(workers)
+        )
+        merge_stats.append(
+            {"Language": lang_config["name"], **stats, "Workers": len(workers)}
+        )
+        shutil.rmtree(paths["root"])
+
+    stage_dir = f"{config['directory']['DATA_DIR']}/work/{stage_name}"
+    if os.path.isdir(stage_dir) and not os.listdir(stage_dir):
+        os.rmdir(stage_dir)
+
+    if merge_stats:
+        print(f"Distributed {stage_name} Summary:")
+        print(pd.DataFrame(merge_stats))
+        print()
+    if unfinished:
+        raise RuntimeError(
+            f"{stage_name} work is not finished for: {', '.join(unfinished)}"
+        )
+
+
+def launch(stage_name: str, lang_codes=None, workers=None) -> None:
+    """Prepare work, run local worker processes until they exit, then merge."""
+    config = load_config()
+    workers = workers or config["distributed"]["workers"]
+    prepare(stage_name, lang_codes)
+
+    command = [sys.executable, "-m", "data_pipeline.distributed", "worker", stage_name]
+    if lang_codes:
+        command += ["--langs", *lang_codes]
+    processes = [subprocess.Popen(command) for _ in range(workers)]
+    for process in processes:
+        process.wait()
+
+    merge(stage_name, lang_codes=lang_codes)
+
+
+def main():
+    config = load_config()
+    parser = argparse.ArgumentParser(description="Distribute a stage across workers")
+    parser.add_argument("command", choices=["prepare", "worker", "merge", "launch"])
+    parser.add_argument("stage", choices=list(STAGES))
+    parser.add_argument(
+        "--langs",
+        nargs="+",
+        choices=list(config["LANGUAGES"]),
+        help="language codes to process (default: all)",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=config["distributed"]["workers"],
+        help="local worker processes to start (launch only)",
+    )
+    args = parser.parse_args()
+
+    if args.command == "prepare":
+        prepare(args.stage, args.langs)
+    elif args.command == "worker":
+        worker(args.stage, lang_codes=args.langs)
+    elif args.command == "merge":
+        merge(args.stage, lang_codes=args.langs)
+    else:
+        launch(args.stage, args.langs, args.workers)
+
+
+if __name__ == "__main__":
+    main()
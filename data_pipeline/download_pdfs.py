@@ -10,7 +10,8 @@ import time
 from pathlib import Path
 import pandas as pd
 from tqdm import tqdm
-from utils import load_config
+from utils import load_config, select_languages
+from data_pipeline import instrumentation, dedup_index
 from selenium import webdriver
 from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.support.ui import WebDriverWait
@@ -49,8 +50,24 @@ def download_pdf(driver, pdf_url: str):
     time.sleep(5)
 
 
-def main():
-    config = load_config()
+def wait_for_download(download_dir: str, known_files: set, timeout: float):
+    """Wait for a new, fully written PDF to appear in the download directory."""
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        files = set(os.listdir(download_dir))
+        in_progress = any(name.endswith(".crdownload") for name in files)
+        new_pdfs = [
+            name for name in files - known_files if name.endswith(".pdf")
+        ]
+        if new_pdfs and not in_progress:
+            return os.path.join(download_dir, new_pdfs[0])
+        time.sleep(0.5)
+    return None
+
+
+@instrumentation.instrumented("download_pdfs")
+def main(lang_codes=None):
+    config = select_languages(load_config(), lang_codes)
     download_stats = []
 
     for lang_code, lang_config in config["LANGUAGES"].items():
@@ -64,7 +81,10 @@ def main():
             print(f"No metadata found for {lang_code}, skipping")
             continue
 
-        articles_df = pd.read_csv(metadata_path)
+        timer = instrumentation.Timer()
+        articles_df, skipped = dedup_index.filter_metadata(
+            config, lang_code, pd.read_csv(metadata_path)
+        )
         driver = setup_pdf_driver(lang_pdf_dir)
 
         # Download PDFs
@@ -75,14 +95,40 @@ def main():
             desc=f"Downloading {lang_config['name']}",
             bar_format=config["PROGRESS_BAR_FORMAT"],
         ):
+            # Only a new PDF in the directory counts, not a page that merely loaded.
+            # download_pdf waits a few seconds, so a download that has not started
+            # by then is not waited for.
+            known_files = set(os.listdir(lang_pdf_dir))
             try:
                 download_pdf(driver, article["pdf_url"])
-                success_count += 1
             except Exception:
-                pass
+                continue
+            if set(os.listdir(lang_pdf_dir)) == known_files:
+                continue
+            pdf_path = wait_for_download(
+                lang_pdf_dir, known_files, config["streaming"]["download_timeout"]
+            )
+            if pdf_path is not None:
+                success_count += 1
+                dedup_index.mark_downloaded(
+                    config, article.get("doi"), article["pdf_url"]
+                )
 
         driver.quit()
+        instrumentation.record_language(
+            "download_pdfs",
+            lang_code,
+            timer,
+            items=len(articles_df),
+            downloaded=success_count,
+            **skipped,
+        )
 
+        # Every article skipped here saves a download. Each successful download of a
+        # duplicate would also have been converted, while PDFs from earlier runs are
+        # converted again anyway. Articles skipped at collection were never queued,
+        # so they are reported without a saving.
+        success_rate = success_count / len(articles_df) if len(articles_df) > 0 else 0
         download_stats.append(
             {
                 "Language": lang_config["name"],
@@ -93,9 +139,24 @@ def main():
                     if len(articles_df) > 0
                     else "0%"
                 ),
+                "Duplicates Skipped": skipped["duplicates"],
+                "Already Downloaded": skipped["already_downloaded"],
+                "Conversions Saved (est.)": round(skipped["duplicates"] * success_rate),
+                "Skipped at Collection": skipped["skipped_at_collection"],
             }
         )
 
+    total_saved = sum(
+        stats["Duplicates Skipped"] + stats["Already Downloaded"]
+        for stats in download_stats
+    )
+    total_conversions = sum(
+        stats["Conversions Saved (est.)"] for stats in download_stats
+    )
     print("PDF Download Summary:")
     print(pd.DataFrame(download_stats))
+    print(
+        f"Skipped {total_saved} duplicate or already downloaded articles, saving "
+        f"{total_saved} downloads and about {total_conversions} conversions"
+    )
     print()
@@ -0,0 +1,193 @@
+"""
+Columnar Corpus Export
+
+This script exports the train/val/test parallel corpus files to Arrow IPC shards
+with precomputed character and word lengths. Each language and split gets a small
+offset index so training loaders can memory-map the shards and read random batches
+without parsing or loading whole files.
+"""
+
+import os
+import json
+import time
+import random
+import pyarrow as pa
+import pandas as pd
+from utils import load_config, select_languages, SPLITS
+from data_pipeline import instrumentation, record_io
+
+
+SCHEMA = pa.schema(
+    [
+        ("target_text", pa.string()),
+        ("source_text", pa.string()),
+        ("target_lang", pa.string()),
+        ("doc_id", pa.string()),
+        ("sent_id", pa.int64()),
+        ("target_chars", pa.int32()),
+        ("target_words", pa.int32()),
+        ("source_chars", pa.int32()),
+        ("source_words", pa.int32()),
+    ]
+)
+
+
+def to_columns(records):
+    """Convert parallel records into columns with precomputed lengths."""
+    return {
+        "target_text": [r["target_text"] for r in records],
+        "source_text": [r["source_text"] for r in records],
+        "target_lang": [r["target_lang"] for r in records],
+        "doc_id": [str(r["doc_id"]) for r in records],
+        "sent_id": [r["sent_id"] for r in records],
+        "target_chars": [len(r["target_text"]) for r in records],
+        "target_words": [len(r["target_text"].split()) for r in records],
+        "source_chars": [len(r["source_text"]) for r in records],
+        "source_words": [len(r["source_text"].split()) for r in records],
+    }
+
+
+def write_shard(records, shard_path: str) -> None:
+    """Write records to a single Arrow IPC shard."""
+    table = pa.Table.from_pydict(to_columns(records), schema=SCHEMA)
+    with pa.OSFile(shard_path, "wb") as sink:
+        with pa.ipc.new_file(sink, SCHEMA) as writer:
+            writer.write_table(table)
+
+
+def export_split(split_file: str, output_dir: str, shard_rows: int) -> dict:
+    """Stream a split JSONL file into Arrow shards and write its offset index."""
+    os.makedirs(output_dir, exist_ok=True)
+    shards = []
+    total_rows = 0
+
+    for records in record_io.iter_chunks(split_file, shard_rows):
+        shard_name = f"shard_{len(shards):05d}.arrow"
+        write_shard(records, os.path.join(output_dir, shard_name))
+        shards.append({"file": shard_name, "start": total_rows, "rows": len(records)})
+        total_rows += len(records)
+
+    index = {"rows": total_rows, "shards": shards}
+    with open(os.path.join(output_dir, "index.json"), "w", encoding="utf-8") as f:
+        json.dump(index, f, indent=2)
+    return index
+
+
+class ShardReader:
+    """Memory-mapped random access over the Arrow shards of one split."""
+
+    def __init__(self, split_dir: str):
+        with open(os.path.join(split_dir, "index.json"), "r", encoding="utf-8") as f:
+            self.index = json.load(f)
+
+        self.starts = [shard["start"] for shard in self.index["shards"]]
+        self.tables = []
+        for shard in self.index["shards"]:
+            source = pa.memory_map(os.path.join(split_dir, shard["file"]), "r")
+            self.tables.append(pa.ipc.open_file(source).read_all())
+
+    def __len__(self):
+        return self.index["rows"]
+
+    def locate(self, row: int):
+        """Map a global row number to (shard number, row within shard)."""
+        lo, hi = 0, len(self.starts) - 1
+        while lo < hi:
+            mid = (lo + hi + 1) // 2
+            if self.starts[mid] <= row:
+                lo = mid
+            else:
+                hi = mid - 1
+        return lo, row - self.starts[lo]
+
+    def take(self, rows, columns=None) -> pa.Table:
+        """Read the given global rows, optionally restricted to some columns."""
+        by_shard = {}
+        for position, row in enumerate(rows):
+            shard_idx, local_row = self.locate(row)
+            by_shard.setdefault(shard_idx, []).append((position, local_row))
+
+        parts = []
+        order = []
+        for shard_idx, entries in by_shard.items():
+            table = self.tables[shard_idx]
+            if columns:
+                table = table.select(columns)
+            parts.append(table.take([local_row for _, local_row in entries]))
+            order.extend(position for position, _ in entries)
+
+        batch = pa.concat_tables(parts)
+        inverse = sorted(range(len(order)), key=lambda i: order[i])
+        return batch.take(inverse)
+
+    def random_batch(self, batch_size: int, rng: random.Random, columns=None):
+        """Read a uniformly sampled batch of rows."""
+        rows = [rng.randrange(len(self)) for _ in range(batch_size)]
+        return self.take(rows, columns)
+
+
+def benchmark(split_file: str, split_dir: str, batch_size: int, num_batches: int, seed: int):
+    """Time random batch reads from the JSONL file against the Arrow shards."""
+    rng = random.Random(seed)
+    start = time.perf_counter()
+    records = list(record_io.iter_records(split_file))
+    for _ in range(num_batches):
+        batch = [records[rng.randrange(len(records))] for _ in range(batch_size)]
+    jsonl_time = time.perf_counter() - start
+
+    rng = random.Random(seed)
+    start = time.perf_counter()
+    reader = ShardReader(split_dir)
+    for _ in range(num_batches):
+        batch = reader.random_batch(batch_size, rng)
+    arrow_time = time.perf_counter() - start
+
+    del batch
+    return {"JSONL (s)": f"{jsonl_time:.3f}", "Arrow (s)": f"{arrow_time:.3f}"}
+
+
+@instrumentation.instrumented("export_corpus")
+def main(run_benchmark: bool = False, lang_codes=None):
+    config = select_languages(load_config(), lang_codes)
+    parallel_data_dir = config["directory"]["PARALLEL_DATA_DIR"]
+    export_dir = config["directory"]["EXPORT_DIR"]
+    export_config = config["data_processing"]["export"]
+    export_stats = []
+
+    for lang_code, lang_config in config["LANGUAGES"].items():
+        timer = instrumentation.Timer()
+        exported_rows = 0
+        for split_name in SPLITS:
+            split_file = f"{parallel_data_dir}/{lang_code}-en_{split_name}.jsonl"
+            if not os.path.exists(split_file):
+                continue
+
+            split_dir = f"{export_dir}/{lang_code}-en_{split_name}"
+            index = export_split(split_file, split_dir, export_config["shard_rows"])
+            exported_rows += index["rows"]
+
+            stats = {
+                "Language": lang_config["name"],
+                "Split": split_name,
+                "Rows": index["rows"],
+                "Shards": len(index["shards"]),
+            }
+            if run_benchmark and index["rows"]:
+                stats.update(
+                    benchmark(
+                        split_file,
+                        split_dir,
+                        export_config["benchmark_batch_size"],
+                        export_config["benchmark_batches"],
+                        config["project"]["seed"],
+                    )
+                )
+            export_stats.append(stats)
+
+        instrumentation.record_language(
+            "export_corpus", lang_code, timer, items=exported_rows
+        )
+
+    print("Corpus Export Summary:")
+    print(pd.DataFrame(export_stats))
+    print()
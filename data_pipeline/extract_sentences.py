@@ -8,12 +8,10 @@ and saves valid sentences in JSONL format.
 
 import os
 import re
-import json
-import spacy
 import pandas as pd
 from tqdm import tqdm
-from utils import load_config
-from lingua import LanguageDetectorBuilder
+from utils import load_config, select_languages
+from data_pipeline import instrumentation, record_io
 
 
 def detect_language(text: str, detector):
@@ -44,13 +42,49 @@ def is_valid_sentence(sentence: str, min_length: int = 10, max_length: int = 500
     return True
 
 
-def main():
-    config = load_config()
-    extraction_stats = []
+def load_models():
+    """Load the spaCy sentence splitter and the language detector."""
+    import spacy
+    from lingua import LanguageDetectorBuilder
 
     nlp = spacy.load("xx_ent_wiki_sm")
     nlp.add_pipe("sentencizer")
     detector = LanguageDetectorBuilder.from_all_languages().build()
+    return nlp, detector
+
+
+def clean_markdown(md_text: str):
+    """Remove code blocks, tables and URLs from markdown text."""
+    md_text = re.sub(r"```.*?```", "", md_text, flags=re.DOTALL)
+    md_text = re.sub(r"\|.*?\|", "", md_text)
+    md_text = re.sub(
+        r"http[s]?://(?:[a-zA-Z]|[0-9]|[$-_@.&+]|[!*\\(\\),]|(?:%[0-9a-fA-F][0-9a-fA-F]))+",
+        "",
+        md_text,
+    )
+    return md_text
+
+
+def extract_document_sentences(md_text: str, lang_code: str, nlp, detector):
+    """Extract the valid target-language sentences of one markdown document."""
+    # Extract sentences
+    doc = nlp(clean_markdown(md_text))
+
+    sentences = []
+    for sent in doc.sents:
+        cleaned = clean_sentence(sent.text)
+        detected_code = detect_language(cleaned, detector)
+        if is_valid_sentence(cleaned) and detected_code == lang_code:
+            sentences.append(cleaned)
+    return sentences
+
+
+@instrumentation.instrumented("extract_sentences")
+def main(lang_codes=None):
+    config = select_languages(load_config(), lang_codes)
+    extraction_stats = []
+
+    nlp, detector = load_models()
 
     for lang_code, lang_config in config["LANGUAGES"].items():
         sents_dir = config["directory"]["SENTENCES_DIR"]
@@ -60,12 +94,13 @@ def main():
         if not os.path.exists(lang_extracted_dir):
             continue
 
+        timer = instrumentation.Timer()
         all_files = os.listdir(lang_extracted_dir)
         markdown_files = [path for path in all_files if path.endswith(".md")]
         total_sentences = 0
         total_documents = 0
 
-        with open(lang_sents_file, "w", encoding="utf-8") as out_file:
+        with record_io.RecordWriter(lang_sents_file, build_index=True) as out_file:
             for markdown_file in tqdm(
                 markdown_files,
                 total=len(markdown_files),
@@ -77,24 +112,9 @@ def main():
                     with open(markdown_path, "r", encoding="utf-8") as f:
                         md_text = f.read()
 
-                    # Clean markdown text
-                    md_text = re.sub(r"```.*?```", "", md_text, flags=re.DOTALL)
-                    md_text = re.sub(r"\|.*?\|", "", md_text)
-                    md_text = re.sub(
-                        r"http[s]?://(?:[a-zA-Z]|[0-9]|[$-_@.&+]|[!*\\(\\),]|(?:%[0-9a-fA-F][0-9a-fA-F]))+",
-                        "",
-                        md_text,
+                    sentences = extract_document_sentences(
+                        md_text, lang_code, nlp, detector
                     )
-
-                    # Extract sentences
-                    doc = nlp(md_text)
-
-                    sentences = []
-                    for sent in doc.sents:
-                        cleaned = clean_sentence(sent.text)
-                        detected_code = detect_language(cleaned, detector)
-                        if is_valid_sentence(cleaned) and detected_code == lang_code:
-                            sentences.append(cleaned)
                     if sentences:
                         total_documents += 1
 
@@ -106,7 +126,7 @@ def main():
                             "doc_id": markdown_file.split(".")[0],
                             "sent_id": idx,
                         }
-                        out_file.write(json.dumps(data, ensure_ascii=False) + "\n")
+                        out_file.write(data)
                         total_sentences += 1
 
                         if total_sentences >= lang_config["target_sentences"]:
@@ -118,6 +138,13 @@ def main():
                 if total_sentences >= lang_config["target_sentences"]:
                     break
 
+        instrumentation.record_language(
+            "extract_sentences",
+            lang_code,
+            timer,
+            items=total_sentences,
+            documents=total_documents,
+        )
         extraction_stats.append(
             {
                 "Language": lang_config["name"],
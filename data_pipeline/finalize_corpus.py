@@ -1,54 +1,212 @@
 """
 Final Processing
 
-TODO:
-1. Trim all datasets to equal length
-2. Split into train/test/val with appropriate ratios
+This script trims every parallel corpus to an equal number of sentence pairs and
+splits each one into train/val/test files. Records are streamed one at a time and
+assigned to a split from a stable hash of their doc_id and the project seed, so all
+sentences of a document land in the same split and memory use stays constant.
+Optionally, each split is also sorted into length-bucketed shards so fine-tuning
+batches can be drawn from sentences of similar length.
 """
 
 import os
 import json
-from utils import load_config
-from sklearn.model_selection import train_test_split
+import random
+import shutil
+import hashlib
+import pandas as pd
+from utils import load_config, select_languages, SPLITS
+from data_pipeline import instrumentation, record_io
+from data_pipeline.generate_statistics import (
+    LENGTH_BIN_EDGES,
+    length_bin,
+    length_bin_labels,
+)
 
 
-def main():
-    config = load_config()
+def split_thresholds(config: dict):
+    """Return cumulative (split, upper bound) pairs from the configured ratios."""
+    split_config = config["data_processing"]["train_val_test_split"]
+    ratios = [
+        split_config["train_ratio"],
+        split_config["validation_ratio"],
+        split_config["test_ratio"],
+    ]
+    total = sum(ratios)
 
-    for lang_code, lang_config in config["LANGUAGES"].items():
-        parallel_data_dir = config["directory"]["PARALLEL_DATA_DIR"]
-        parallel_sents_file = f"{parallel_data_dir}/{lang_code}-en_data.jsonl"
+    thresholds = []
+    cumulative = 0.0
+    for split_name, ratio in zip(SPLITS, ratios):
+        cumulative += ratio / total
+        thresholds.append((split_name, cumulative))
+    return thresholds
+
+
+def assign_split(doc_id: str, seed: int, thresholds) -> str:
+    """Assign a document to a split from a stable hash of its doc_id and the seed."""
+    digest = hashlib.md5(f"{seed}:{doc_id}".encode("utf-8")).digest()
+    position = int.from_bytes(digest[:8], "big") / 2**64
+
+    for split_name, upper_bound in thresholds:
+        if position < upper_bound:
+            return split_name
+    return thresholds[-1][0]
+
+
+def bucket_split(
+    split_file: str, output_dir: str, edges, shard_rows: int, shuffle_seed: str
+) -> dict:
+    """Sort a split into length-bucketed shards and write their manifest."""
+    if os.path.exists(output_dir):
+        shutil.rmtree(output_dir)
+    os.makedirs(output_dir)
+    labels = length_bin_labels(edges)
 
-        if not os.path.exists(parallel_sents_file):
-            continue
+    # Distribute records into one temporary file per bucket
+    bucket_paths = [f"{output_dir}/bucket_{idx:02d}.tmp" for idx in range(len(labels))]
+    bucket_files = [open(path, "wb") for path in bucket_paths]
+    try:
+        with open(split_file, "rb") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                item = record_io.loads(line)
+                bucket_idx = length_bin(len(item["target_text"]), edges)
+                bucket_files[bucket_idx].write(line)
+    finally:
+        for bucket_file in bucket_files:
+            bucket_file.close()
 
-        with open(parallel_sents_file, "r", encoding="utf-8") as f:
-            paralell_sents = [json.loads(line) for line in f]
+    # Shuffle each bucket deterministically and cut it into shards
+    buckets = []
+    for bucket_idx, (label, bucket_path) in enumerate(zip(labels, bucket_paths)):
+        with open(bucket_path, "rb") as f:
+            lines = f.readlines()
+        os.remove(bucket_path)
+        random.Random(f"{shuffle_seed}:{label}").shuffle(lines)
 
-        num_sents = len(paralell_sents)
-        target_sents = lang_config["target_sentences"]
+        shards = []
+        for shard_start in range(0, len(lines), shard_rows):
+            shard_name = f"bucket_{bucket_idx:02d}_{len(shards):04d}.jsonl"
+            shard_lines = lines[shard_start : shard_start + shard_rows]
+            with open(f"{output_dir}/{shard_name}", "wb") as f:
+                f.writelines(shard_lines)
+            shards.append({"file": shard_name, "rows": len(shard_lines)})
 
-        print(
-            f"Created {num_sents} parallel sentence pairs of {target_sents} target pairs"
+        buckets.append(
+            {
+                "label": label,
+                "max_length": edges[bucket_idx] if bucket_idx < len(edges) else None,
+                "rows": len(lines),
+                "shards": shards,
+            }
         )
 
-        val_ratio = config["data_processing"]["train_val_test_split"]["val_ratio"]
-        test_ratio = config["data_processing"]["train_val_test_split"]["val_ratio"]
-        temp_ratio = val_ratio + test_ratio
-        seed = config["project"]["seed"]
+    manifest = {"edges": list(edges), "buckets": buckets}
+    with open(f"{output_dir}/manifest.json", "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+
+def bucket_corpus(config: dict, lang_codes) -> None:
+    """Write length-bucketed shards for every split of the given languages."""
+    parallel_data_dir = config["directory"]["PARALLEL_DATA_DIR"]
+    bucket_config = config["data_processing"]["length_buckets"]
+    edges = bucket_config.get("edges") or LENGTH_BIN_EDGES
+    seed = config["project"]["seed"]
+    bucket_stats = []
+
+    for lang_code in lang_codes:
+        for split_name in SPLITS:
+            split_file = f"{parallel_data_dir}/{lang_code}-en_{split_name}.jsonl"
+            output_dir = f"{parallel_data_dir}/buckets/{lang_code}-en_{split_name}"
+            manifest = bucket_split(
+                split_file,
+                output_dir,
+                edges,
+                bucket_config["shard_rows"],
+                f"{seed}:{lang_code}:{split_name}",
+            )
+            stats = {"Code": lang_code, "Split": split_name}
+            stats.update({b["label"]: b["rows"] for b in manifest["buckets"]})
+            bucket_stats.append(stats)
+
+    print("Length Buckets:")
+    print(pd.DataFrame(bucket_stats))
+    print()
+
 
-        train, temp = train_test_split(
-            paralell_sents, test_size=temp_ratio, random_state=seed
+@instrumentation.instrumented("finalize_corpus")
+def main(lang_codes=None):
+    config = select_languages(load_config(), lang_codes)
+    parallel_data_dir = config["directory"]["PARALLEL_DATA_DIR"]
+    seed = config["project"]["seed"]
+    thresholds = split_thresholds(config)
+
+    # First pass: count pairs per language to find the common trimmed size
+    parallel_files = {}
+    for lang_code in config["LANGUAGES"]:
+        parallel_sents_file = f"{parallel_data_dir}/{lang_code}-en_data.jsonl"
+        if os.path.exists(parallel_sents_file):
+            parallel_files[lang_code] = parallel_sents_file
+
+    if not parallel_files:
+        print("No parallel data found, skipping")
+        return
+
+    num_sents = {
+        lang_code: record_io.count_records(file_path)
+        for lang_code, file_path in parallel_files.items()
+    }
+    trimmed_size = min(num_sents.values())
+
+    # Second pass: stream records into their splits, stopping at the trimmed size
+    split_stats = []
+    for lang_code, parallel_sents_file in parallel_files.items():
+        lang_config = config["LANGUAGES"][lang_code]
+        timer = instrumentation.Timer()
+        split_counts = {split_name: 0 for split_name in SPLITS}
+
+        output_files = {
+            split_name: record_io.RecordWriter(
+                f"{parallel_data_dir}/{lang_code}-en_{split_name}.jsonl",
+                build_index=True,
+            )
+            for split_name in SPLITS
+        }
+        try:
+            kept = 0
+            for item in record_io.iter_records(parallel_sents_file):
+                if kept >= trimmed_size:
+                    break
+
+                split_name = assign_split(item["doc_id"], seed, thresholds)
+                output_files[split_name].write(item)
+                split_counts[split_name] += 1
+                kept += 1
+        finally:
+            for output_file in output_files.values():
+                output_file.close()
+
+        instrumentation.record_language(
+            "finalize_corpus", lang_code, timer, items=kept, **split_counts
         )
-        val, test = train_test_split(
-            temp, test_size=test_ratio / temp_ratio, random_state=seed
+        split_stats.append(
+            {
+                "Language": lang_config["name"],
+                "Code": lang_code,
+                "Pairs": num_sents[lang_code],
+                "Target": lang_config["target_sentences"],
+                "Kept": kept,
+                "Train": split_counts["train"],
+                "Val": split_counts["val"],
+                "Test": split_counts["test"],
+            }
         )
 
-        # Save splits
-        for split_name, split_data in [("train", train), ("val", val), ("test", test)]:
-            output_file = f"{parallel_data_dir}/{lang_code}-en_{split_name}.jsonl"
-            with open(output_file, "w", encoding="utf-8") as f:
-                for item in split_data:
-                    f.write(json.dumps(item) + "\n")
-
     print("\nParallel Corpus Split:")
+    print(pd.DataFrame(split_stats))
+    print()
+
+    if config["data_processing"]["length_buckets"]["enabled"]:
+        bucket_corpus(config, list(parallel_files))
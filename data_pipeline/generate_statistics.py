@@ -3,90 +3,522 @@ Sentence Statistics Analyzer
 
 This script analyzes JSONL sentence files to generate comprehensive statistics
 including sentence length distributions, duplicate detection, and language-specific metrics.
+Each file is read once in chunks into a mergeable summary, so files can be processed
+in parallel and per-language and global reports are built by merging summaries.
+
+Duplicates are counted on 64-bit sentence hashes rather than sentence strings. In
+"exact" mode every distinct hash is kept with its count; in "approximate" mode each
+file keeps a HyperLogLog sketch of its sentences, a sketch of the sentences it
+repeats (found with a Bloom filter) and the filter itself, in fixed memory. The
+distinct count has a relative standard error of about 1.04 / sqrt(2 ** hll_precision).
+Unique duplicate sentences across files are estimated from the per-file sketches by
+counting the sentences seen exactly once; the error bound printed with them sums the
+standard errors of every sketch estimate involved, so it grows with the number of files.
+
+File summaries are cached next to each JSONL file and keyed by its size, mtime and
+content hash, so only files that changed since the last run are read again.
 """
 
 import os
 import json
+import math
+import hashlib
+import numpy as np
 import pandas as pd
-from collections import Counter, defaultdict
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from tqdm import tqdm
 from utils import load_config
+from data_pipeline import instrumentation, record_io
 
 
-def calculate_stats(sentences_data):
-    """Calculate statistics for a list of sentences."""
-    lengths = [len(s) for s in sentences_data]
-    word_counts = [len(s.split()) for s in sentences_data]
+LENGTH_BIN_EDGES = [50, 100, 200, 300, 400]
 
+
+def length_bin_labels(edges=LENGTH_BIN_EDGES):
+    """Return the bin labels for the given upper bin edges."""
+    labels = []
+    lower = 0
+    for edge in edges:
+        labels.append(f"{lower}-{edge}")
+        lower = edge + 1
+    labels.append(f"{lower}+")
+    return labels
+
+
+def length_bin(length: int, edges=LENGTH_BIN_EDGES) -> int:
+    """Return the index of the bin a sentence length falls into."""
+    for idx, edge in enumerate(edges):
+        if length <= edge:
+            return idx
+    return len(edges)
+
+
+def sentence_hashes(texts):
+    """Hash sentences to 64-bit integers."""
+    return np.fromiter(
+        (
+            int.from_bytes(
+                hashlib.blake2b(t.encode("utf-8"), digest_size=8).digest(), "little"
+            )
+            for t in texts
+        ),
+        dtype=np.uint64,
+        count=len(texts),
+    )
+
+
+def merge_hash_counts(a, b):
+    """Merge two (sorted unique hashes, counts) pairs."""
+    hashes, inverse = np.unique(np.concatenate([a[0], b[0]]), return_inverse=True)
+    counts = np.bincount(inverse, weights=np.concatenate([a[1], b[1]]))
+    return hashes, counts.astype(np.int64)
+
+
+def leading_zeros(values):
+    """Count leading zero bits of 64-bit unsigned integers."""
+    zeros = np.zeros(len(values), dtype=np.int64)
+    values = values.copy()
+    for shift in (32, 16, 8, 4, 2, 1):
+        small = values < np.uint64(1 << (64 - shift))
+        zeros[small] += shift
+        values[small] <<= np.uint64(shift)
+    return zeros
+
+
+def hll_add(registers, hashes):
+    """Add 64-bit hashes to a HyperLogLog register array."""
+    precision = int(math.log2(len(registers)))
+    index = (hashes >> np.uint64(64 - precision)).astype(np.int64)
+    rank = np.minimum(leading_zeros(hashes << np.uint64(precision)), 64 - precision)
+    np.maximum.at(registers, index, (rank + 1).astype(np.uint8))
+
+
+def hll_estimate(registers) -> float:
+    """Estimate the number of distinct items in a HyperLogLog sketch."""
+    m = len(registers)
+    alpha = 0.7213 / (1 + 1.079 / m)
+    estimate = alpha * m * m / np.sum(np.power(2.0, -registers.astype(np.float64)))
+
+    empty = int(np.count_nonzero(registers == 0))
+    if estimate <= 2.5 * m and empty:
+        estimate = m * math.log(m / empty)
+    return float(estimate)
+
+
+def bloom_positions(hashes, num_bits: int, num_hashes: int):
+    """Derive Bloom filter bit positions by double hashing."""
+    h1 = (hashes & np.uint64(0xFFFFFFFF)).astype(np.uint64)
+    h2 = (hashes >> np.uint64(32)) | np.uint64(1)
+    steps = np.arange(num_hashes, dtype=np.uint64)
+    return ((h1[:, None] + steps[None, :] * h2[:, None]) % np.uint64(num_bits)).astype(
+        np.int64
+    )
+
+
+def bloom_contains_and_add(bits, hashes, num_hashes: int):
+    """Return which hashes were already in the filter, then add them all."""
+    positions = bloom_positions(hashes, len(bits) * 8, num_hashes)
+    set_bits = (bits[positions >> 3] >> (positions & 7).astype(np.uint8)) & 1
+    seen = set_bits.all(axis=1)
+    np.bitwise_or.at(
+        bits, (positions >> 3).ravel(), (1 << (positions & 7)).astype(np.uint8).ravel()
+    )
+    return seen
+
+
+def empty_duplicates(stats_config):
+    """Create empty duplicate tracking state for the configured mode."""
+    if stats_config["duplicate_mode"] == "approximate":
+        registers = 2 ** stats_config["hll_precision"]
+        # One row of HyperLogLog registers per file, merged summaries stack the rows
+        return {
+            "mode": "approximate",
+            "hll": np.zeros((1, registers), dtype=np.uint8),
+            "dup_hll": np.zeros((1, registers), dtype=np.uint8),
+            "bloom": np.zeros(stats_config["bloom_bits"] // 8, dtype=np.uint8),
+            "bloom_hashes": stats_config["bloom_hashes"],
+        }
+    return {
+        "mode": "exact",
+        "hashes": np.zeros(0, dtype=np.uint64),
+        "counts": np.zeros(0, dtype=np.int64),
+    }
+
+
+def update_duplicates(duplicates, texts):
+    """Fold a chunk of sentences into the duplicate tracking state."""
+    hashes, counts = np.unique(sentence_hashes(texts), return_counts=True)
+
+    if duplicates["mode"] == "exact":
+        duplicates["hashes"], duplicates["counts"] = merge_hash_counts(
+            (duplicates["hashes"], duplicates["counts"]), (hashes, counts)
+        )
+        return
+
+    seen = bloom_contains_and_add(
+        duplicates["bloom"], hashes, duplicates["bloom_hashes"]
+    )
+    hll_add(duplicates["hll"][-1], hashes)
+    hll_add(duplicates["dup_hll"][-1], hashes[seen | (counts > 1)])
+
+
+def merge_duplicates(a, b):
+    """Merge two duplicate tracking states."""
+    if a["mode"] == "exact":
+        hashes, counts = merge_hash_counts(
+            (a["hashes"], a["counts"]), (b["hashes"], b["counts"])
+        )
+        return {"mode": "exact", "hashes": hashes, "counts": counts}
+
+    # Keep each part's sketches, sentences shared between parts are found at report time
+    return {
+        "mode": "approximate",
+        "hll": np.concatenate([a["hll"], b["hll"]]),
+        "dup_hll": np.concatenate([a["dup_hll"], b["dup_hll"]]),
+        "bloom": a["bloom"] | b["bloom"],
+        "bloom_hashes": a["bloom_hashes"],
+    }
+
+
+def estimate_unique_duplicates(duplicates):
+    """Estimate sentences seen more than once across all parts, with an error bound.
+
+    A sentence is seen once overall if it is seen once in part i and in no other part.
+    Those sentences number |all parts| - |dups of i + other parts|, so the unique
+    duplicates are the sum of |dups of i + other parts| minus (parts - 1) * |all parts|.
+    """
+    parts = duplicates["hll"]
+    num_parts = len(parts)
+
+    # Union of every other part, from prefix and suffix maxima
+    zeros = np.zeros((1, parts.shape[1]), dtype=np.uint8)
+    before = np.maximum.accumulate(np.concatenate([zeros, parts[:-1]]), axis=0)
+    after = np.maximum.accumulate(np.concatenate([zeros, parts[:0:-1]]), axis=0)[::-1]
+    others = np.maximum(before, after)
+
+    distinct = hll_estimate(parts.max(axis=0))
+    covered = [
+        hll_estimate(np.maximum(duplicates["dup_hll"][i], others[i]))
+        for i in range(num_parts)
+    ]
+    estimate = sum(covered) - (num_parts - 1) * distinct
+
+    relative_error = 1.04 / math.sqrt(parts.shape[1])
+    error = relative_error * (sum(covered) + (num_parts - 1) * distinct)
+    return min(max(estimate, 0.0), distinct), error
+
+
+def empty_summary(stats_config):
+    """Create an empty streaming summary."""
     return {
-        "total": len(sentences_data),
-        "avg_length": sum(lengths) / len(lengths) if lengths else 0,
-        "min_length": min(lengths) if lengths else 0,
-        "max_length": max(lengths) if lengths else 0,
-        "avg_words": sum(word_counts) / len(word_counts) if word_counts else 0,
-        "min_words": min(word_counts) if word_counts else 0,
-        "max_words": max(word_counts) if word_counts else 0,
+        "total": 0,
+        "length_sum": 0,
+        "min_length": None,
+        "max_length": None,
+        "word_sum": 0,
+        "min_words": None,
+        "max_words": None,
+        "histogram": np.zeros(len(LENGTH_BIN_EDGES) + 1, dtype=np.int64),
+        "doc_ids": set(),
+        "duplicates": empty_duplicates(stats_config),
     }
 
 
-def find_duplicates(sentences_data):
-    """Find duplicate sentences and return statistics."""
-    sentence_counts = Counter(sentences_data)
-    duplicates = {s: c for s, c in sentence_counts.items() if c > 1}
+def combine_min(a, b):
+    """Minimum that treats None as missing."""
+    return b if a is None else a if b is None else min(a, b)
+
+
+def combine_max(a, b):
+    """Maximum that treats None as missing."""
+    return b if a is None else a if b is None else max(a, b)
+
 
-    total_duplicates = sum(c - 1 for c in duplicates.values())
-    unique_duplicates = len(duplicates)
+def update_summary(summary, texts, doc_ids):
+    """Fold a chunk of sentences into a summary."""
+    if not texts:
+        return summary
+
+    lengths = np.fromiter((len(t) for t in texts), dtype=np.int64, count=len(texts))
+    words = np.fromiter(
+        (len(t.split()) for t in texts), dtype=np.int64, count=len(texts)
+    )
+    bins = np.searchsorted(LENGTH_BIN_EDGES, lengths, side="left")
+
+    summary["total"] += len(texts)
+    summary["length_sum"] += int(lengths.sum())
+    summary["min_length"] = combine_min(summary["min_length"], int(lengths.min()))
+    summary["max_length"] = combine_max(summary["max_length"], int(lengths.max()))
+    summary["word_sum"] += int(words.sum())
+    summary["min_words"] = combine_min(summary["min_words"], int(words.min()))
+    summary["max_words"] = combine_max(summary["max_words"], int(words.max()))
+    summary["histogram"] += np.bincount(bins, minlength=len(LENGTH_BIN_EDGES) + 1)
+    summary["doc_ids"].update(doc_ids)
+    update_duplicates(summary["duplicates"], texts)
+    return summary
+
+
+def merge_summaries(a, b):
+    """Merge two summaries into a new one."""
+    return {
+        "total": a["total"] + b["total"],
+        "length_sum": a["length_sum"] + b["length_sum"],
+        "min_length": combine_min(a["min_length"], b["min_length"]),
+        "max_length": combine_max(a["max_length"], b["max_length"]),
+        "word_sum": a["word_sum"] + b["word_sum"],
+        "min_words": combine_min(a["min_words"], b["min_words"]),
+        "max_words": combine_max(a["max_words"], b["max_words"]),
+        "histogram": a["histogram"] + b["histogram"],
+        "doc_ids": a["doc_ids"] | b["doc_ids"],
+        "duplicates": merge_duplicates(a["duplicates"], b["duplicates"]),
+    }
+
+
+def summarize_file(file_path: str, stats_config: dict, digest=None):
+    """Read a JSONL sentence file once, in chunks, into a summary.
+
+    If a digest is given, the file's contents are hashed in the same pass.
+    """
+    summary = empty_summary(stats_config)
+    for chunk in record_io.iter_chunks(file_path, stats_config["chunk_size"], digest):
+        update_summary(
+            summary,
+            [data["text"] for data in chunk],
+            [data["doc_id"] for data in chunk],
+        )
+    return summary
+
+
+SUMMARY_CACHE_VERSION = 2
+
+
+def summary_cache_path(file_path: str) -> str:
+    """Return the path of the cached summary for a sentence file."""
+    return f"{file_path}.summary.npz"
+
+
+def summary_settings(stats_config: dict) -> dict:
+    """Return the settings a cached summary must have been computed with."""
+    return {
+        "version": SUMMARY_CACHE_VERSION,
+        "edges": LENGTH_BIN_EDGES,
+        "duplicate_mode": stats_config["duplicate_mode"],
+        "hll_precision": stats_config["hll_precision"],
+        "bloom_bits": stats_config["bloom_bits"],
+        "bloom_hashes": stats_config["bloom_hashes"],
+    }
+
+
+def content_digest():
+    """Return an empty digest of the kind used for cache content hashes."""
+    return hashlib.blake2b(digest_size=16)
+
+
+def content_hash(file_path: str) -> str:
+    """Hash the contents of a file."""
+    digest = content_digest()
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def save_summary(
+    file_path: str, summary, stats_config: dict, file_stat, file_hash: str
+) -> None:
+    """Write a file summary to its cache, keyed by the file state it was read from."""
+    duplicates = summary["duplicates"]
+    meta = {
+        "settings": summary_settings(stats_config),
+        "size": file_stat.st_size,
+        "mtime_ns": file_stat.st_mtime_ns,
+        "content_hash": file_hash,
+        "scalars": {
+            key: summary[key]
+            for key in (
+                "total",
+                "length_sum",
+                "min_length",
+                "max_length",
+                "word_sum",
+                "min_words",
+                "max_words",
+            )
+        },
+        "duplicates": {
+            key: value
+            for key, value in duplicates.items()
+            if not isinstance(value, np.ndarray)
+        },
+    }
+    arrays = {
+        f"dup_{key}": value
+        for key, value in duplicates.items()
+        if isinstance(value, np.ndarray)
+    }
+
+    # Write to a temporary file first so an interrupted run never leaves a bad cache
+    cache_path = summary_cache_path(file_path)
+    with open(f"{cache_path}.tmp", "wb") as f:
+        np.savez(
+            f,
+            meta=np.array(json.dumps(meta)),
+            histogram=summary["histogram"],
+            doc_ids=np.array(sorted(summary["doc_ids"]), dtype=str),
+            **arrays,
+        )
+    os.replace(f"{cache_path}.tmp", cache_path)
+
+
+def load_summary(file_path: str, stats_config: dict):
+    """Return the cached summary of a file, or None if it is missing or stale."""
+    cache_path = summary_cache_path(file_path)
+    if not os.path.exists(cache_path):
+        return None
+
+    with np.load(cache_path) as cache:
+        meta = json.loads(str(cache["meta"]))
+        if meta["settings"] != summary_settings(stats_config):
+            return None
+
+        file_stat = os.stat(file_path)
+        if file_stat.st_size != meta["size"]:
+            return None
+        if file_stat.st_mtime_ns != meta["mtime_ns"]:
+            # Touched but possibly unchanged, so fall back to the content hash
+            if content_hash(file_path) != meta["content_hash"]:
+                return None
+
+        summary = dict(meta["scalars"])
+        summary["histogram"] = cache["histogram"]
+        summary["doc_ids"] = set(cache["doc_ids"].tolist())
+        summary["duplicates"] = dict(meta["duplicates"])
+        for key in cache.files:
+            if key.startswith("dup_"):
+                summary["duplicates"][key[len("dup_") :]] = cache[key]
+
+    if file_stat.st_mtime_ns != meta["mtime_ns"]:
+        save_summary(file_path, summary, stats_config, file_stat, meta["content_hash"])
+    return summary
+
+
+def summarize_and_cache(file_path: str, stats_config: dict):
+    """Summarize a file and save the result to its cache.
+
+    The file is stat'ed before it is read and hashed while it is read, so a file that
+    changes meanwhile is cached under a key that no longer matches it.
+    """
+    file_stat = os.stat(file_path)
+    digest = content_digest()
+    summary = summarize_file(file_path, stats_config, digest)
+    save_summary(file_path, summary, stats_config, file_stat, digest.hexdigest())
+    return summary
+
+
+def calculate_stats(summary):
+    """Calculate length statistics from a summary."""
+    total = summary["total"]
+    return {
+        "total": total,
+        "avg_length": summary["length_sum"] / total if total else 0,
+        "min_length": summary["min_length"] or 0,
+        "max_length": summary["max_length"] or 0,
+        "avg_words": summary["word_sum"] / total if total else 0,
+        "min_words": summary["min_words"] or 0,
+        "max_words": summary["max_words"] or 0,
+    }
+
+
+def find_duplicates(summary):
+    """Return duplicate statistics from a summary."""
+    duplicates = summary["duplicates"]
+    total = summary["total"]
+
+    if duplicates["mode"] == "exact":
+        repeated = duplicates["counts"][duplicates["counts"] > 1]
+        total_duplicates = int(np.sum(repeated - 1))
+        unique_duplicates = len(repeated)
+        error = 0.0
+        unique_error = 0.0
+    else:
+        distinct = min(hll_estimate(duplicates["hll"].max(axis=0)), total)
+        total_duplicates = round(total - distinct)
+        error = 1.04 / math.sqrt(duplicates["hll"].shape[1]) * distinct
+        unique_duplicates, unique_error = estimate_unique_duplicates(duplicates)
+        unique_duplicates = round(unique_duplicates)
 
     return {
         "total_duplicate_instances": total_duplicates,
         "unique_duplicate_sentences": unique_duplicates,
-        "duplicate_percentage": (total_duplicates / len(sentences_data) * 100)
-        if sentences_data
-        else 0,
+        "unique_duplicate_error": unique_error,
+        "duplicate_percentage": (total_duplicates / total * 100) if total else 0,
+        "duplicate_percentage_error": (error / total * 100) if total else 0,
+        "bloom_false_positive_rate": bloom_false_positive_rate(summary),
     }
 
 
-def analyze_sentence_distribution(sentences_data):
-    """Analyze sentence length distribution in bins."""
-    lengths = [len(s) for s in sentences_data]
+def bloom_false_positive_rate(summary) -> float:
+    """Expected Bloom filter false positive rate after the summary's insertions."""
+    duplicates = summary["duplicates"]
+    if duplicates["mode"] == "exact":
+        return 0.0
+
+    num_bits = len(duplicates["bloom"]) * 8
+    num_hashes = duplicates["bloom_hashes"]
+    return (1 - math.exp(-num_hashes * summary["total"] / num_bits)) ** num_hashes
 
-    bins = {"0-50": 0, "51-100": 0, "101-200": 0, "201-300": 0, "301-400": 0, "401+": 0}
 
-    for length in lengths:
-        if length <= 50:
-            bins["0-50"] += 1
-        elif length <= 100:
-            bins["51-100"] += 1
-        elif length <= 200:
-            bins["101-200"] += 1
-        elif length <= 300:
-            bins["201-300"] += 1
-        elif length <= 400:
-            bins["301-400"] += 1
-        else:
-            bins["401+"] += 1
+def analyze_sentence_distribution(summary):
+    """Return the sentence length distribution in bins."""
+    return dict(zip(length_bin_labels(), summary["histogram"].tolist()))
 
-    return bins
 
+def print_detailed_stats(summary):
+    """Print the detailed statistics block for a summary."""
+    stats = calculate_stats(summary)
+    dup_stats = find_duplicates(summary)
+    distribution = analyze_sentence_distribution(summary)
 
+    print(f"  Total Sentences: {stats['total']:,}")
+    print(f"  Average Length: {stats['avg_length']:.1f} characters")
+    print(f"  Length Range: {stats['min_length']}-{stats['max_length']} characters")
+    print(f"  Average Words: {stats['avg_words']:.1f} words")
+    print(f"  Word Range: {stats['min_words']}-{stats['max_words']} words")
+    print(f"  Unique Duplicate Sentences: {dup_stats['unique_duplicate_sentences']:,}")
+    print(f"  Total Duplicate Instances: {dup_stats['total_duplicate_instances']:,}")
+    print(f"  Duplicate Percentage: {dup_stats['duplicate_percentage']:.2f}%")
+    if summary["duplicates"]["mode"] == "approximate":
+        print(
+            f"  Approximate: ±{dup_stats['duplicate_percentage_error']:.2f}% (1 std err), "
+            f"Bloom false positive rate {dup_stats['bloom_false_positive_rate']:.2e}"
+        )
+        print(
+            f"  Unique Duplicates Error Bound: "
+            f"±{dup_stats['unique_duplicate_error']:,.0f} sentences"
+        )
+
+    print("\n  Length Distribution:")
+    for bin_range, count in distribution.items():
+        percentage = (count / stats["total"] * 100) if stats["total"] else 0
+        print(f"    {bin_range:>10} chars: {count:>6} ({percentage:>5.1f}%)")
+
+
+@instrumentation.instrumented("generate_statistics")
 def main():
     config = load_config()
     sents_dir = config["directory"]["SENTENCES_DIR"]
+    stats_config = config["statistics"]
 
     if not os.path.exists(sents_dir):
         print(f"Error: Sentences directory not found: {sents_dir}")
         return
 
-    all_stats = []
-    global_sentences = []
-    lang_sentences = defaultdict(list)
-
     print("=" * 80)
     print("SENTENCE STATISTICS ANALYZER")
     print("=" * 80)
 
     # Read all JSONL files
-    jsonl_files = [f for f in os.listdir(sents_dir) if f.endswith(".jsonl")]
+    jsonl_files = sorted(f for f in os.listdir(sents_dir) if f.endswith(".jsonl"))
 
     if not jsonl_files:
         print(f"No JSONL files found in {sents_dir}")
@@ -94,50 +526,83 @@ def main():
 
     print(f"\nFound {len(jsonl_files)} JSONL file(s)\n")
 
-    for jsonl_file in tqdm(
-        jsonl_files,
-        desc="Reading sentence files",
-        bar_format=config.get(
-            "PROGRESS_BAR_FORMAT", "{l_bar}{bar}| {n_fmt}/{total_fmt}"
-        ),
-    ):
+    # Reuse cached summaries, summarize changed files in parallel
+    timer = instrumentation.Timer()
+    file_summaries = {}
+    for jsonl_file in jsonl_files:
+        summary = load_summary(os.path.join(sents_dir, jsonl_file), stats_config)
+        if summary is not None:
+            file_summaries[jsonl_file] = summary
+
+    changed_files = [f for f in jsonl_files if f not in file_summaries]
+    print(f"Cached: {len(file_summaries)}, recomputing: {len(changed_files)}\n")
+
+    if changed_files:
+        with ProcessPoolExecutor(max_workers=stats_config["workers"]) as executor:
+            futures = {
+                executor.submit(
+                    summarize_and_cache,
+                    os.path.join(sents_dir, jsonl_file),
+                    stats_config,
+                ): jsonl_file
+                for jsonl_file in changed_files
+            }
+            for future in tqdm(
+                as_completed(futures),
+                total=len(futures),
+                desc="Reading sentence files",
+                bar_format=config.get(
+                    "PROGRESS_BAR_FORMAT", "{l_bar}{bar}| {n_fmt}/{total_fmt}"
+                ),
+            ):
+                jsonl_file = futures[future]
+                try:
+                    file_summaries[jsonl_file] = future.result()
+                except Exception as e:
+                    print(f"Error processing {jsonl_file}: {str(e)}")
+
+    # Merge file summaries per language
+    lang_summaries = {}
+    for jsonl_file in jsonl_files:
+        if jsonl_file not in file_summaries:
+            continue
         lang_code = jsonl_file.replace("_sentences.jsonl", "")
-        file_path = os.path.join(sents_dir, jsonl_file)
-
-        sentences = []
-        doc_ids = set()
-
-        try:
-            with open(file_path, "r", encoding="utf-8") as f:
-                for line in f:
-                    if line.strip():
-                        data = json.loads(line)
-                        sentences.append(data["text"])
-                        doc_ids.add(data["doc_id"])
-                        global_sentences.append(data["text"])
-                        lang_sentences[lang_code].append(data["text"])
-
-            # Calculate stats for this language
-            stats = calculate_stats(sentences)
-            dup_stats = find_duplicates(sentences)
-
-            lang_name = config["LANGUAGES"].get(lang_code, {}).get("name", lang_code)
-
-            all_stats.append(
-                {
-                    "Language": lang_name,
-                    "Code": lang_code,
-                    "Sentences": stats["total"],
-                    "Documents": len(doc_ids),
-                    "Avg Len": f"{stats['avg_length']:.1f}",
-                    "Avg Words": f"{stats['avg_words']:.1f}",
-                    "Duplicates": dup_stats["unique_duplicate_sentences"],
-                    "Dup %": f"{dup_stats['duplicate_percentage']:.2f}%",
-                }
-            )
+        summary = file_summaries[jsonl_file]
+        if lang_code in lang_summaries:
+            summary = merge_summaries(lang_summaries[lang_code], summary)
+        lang_summaries[lang_code] = summary
 
-        except Exception as e:
-            print(f"Error processing {jsonl_file}: {str(e)}")
+    all_stats = []
+    global_summary = empty_summary(stats_config)
+    for lang_code in sorted(lang_summaries):
+        summary = lang_summaries[lang_code]
+        global_summary = merge_summaries(global_summary, summary)
+
+        stats = calculate_stats(summary)
+        dup_stats = find_duplicates(summary)
+        lang_name = config["LANGUAGES"].get(lang_code, {}).get("name", lang_code)
+
+        all_stats.append(
+            {
+                "Language": lang_name,
+                "Code": lang_code,
+                "Sentences": stats["total"],
+                "Documents": len(summary["doc_ids"]),
+                "Avg Len": f"{stats['avg_length']:.1f}",
+                "Avg Words": f"{stats['avg_words']:.1f}",
+                "Duplicates": dup_stats["unique_duplicate_sentences"],
+                "Dup %": f"{dup_stats['duplicate_percentage']:.2f}%",
+            }
+        )
+
+    instrumentation.record_language(
+        "generate_statistics",
+        "all",
+        timer,
+        items=global_summary["total"],
+        cached_files=len(jsonl_files) - len(changed_files),
+        recomputed_files=len(changed_files),
+    )
 
     # Print summary table
     print("\n" + "=" * 80)
@@ -151,65 +616,17 @@ def main():
     print("DETAILED STATISTICS BY LANGUAGE")
     print("=" * 80)
 
-    for lang_code, sentences in lang_sentences.items():
+    for lang_code in sorted(lang_summaries):
         lang_name = config["LANGUAGES"].get(lang_code, {}).get("name", lang_code)
         print(f"\n{lang_name} ({lang_code}):")
         print("-" * 40)
-
-        stats = calculate_stats(sentences)
-        dup_stats = find_duplicates(sentences)
-        distribution = analyze_sentence_distribution(sentences)
-
-        print(f"  Total Sentences: {stats['total']:,}")
-        print(f"  Average Length: {stats['avg_length']:.1f} characters")
-        print(f"  Length Range: {stats['min_length']}-{stats['max_length']} characters")
-        print(f"  Average Words: {stats['avg_words']:.1f} words")
-        print(f"  Word Range: {stats['min_words']}-{stats['max_words']} words")
-        print(
-            f"  Unique Duplicate Sentences: {dup_stats['unique_duplicate_sentences']:,}"
-        )
-        print(
-            f"  Total Duplicate Instances: {dup_stats['total_duplicate_instances']:,}"
-        )
-        print(f"  Duplicate Percentage: {dup_stats['duplicate_percentage']:.2f}%")
-
-        print("\n  Length Distribution:")
-        for bin_range, count in distribution.items():
-            percentage = (count / len(sentences) * 100) if sentences else 0
-            print(f"    {bin_range:>10} chars: {count:>6} ({percentage:>5.1f}%)")
+        print_detailed_stats(lang_summaries[lang_code])
 
     # Print global statistics
-    if global_sentences:
+    if global_summary["total"]:
         print("\n" + "=" * 80)
         print("GLOBAL STATISTICS (ALL LANGUAGES)")
         print("=" * 80)
-
-        global_stats = calculate_stats(global_sentences)
-        global_dup_stats = find_duplicates(global_sentences)
-        global_distribution = analyze_sentence_distribution(global_sentences)
-
-        print(f"  Total Sentences: {global_stats['total']:,}")
-        print(f"  Average Length: {global_stats['avg_length']:.1f} characters")
-        print(
-            f"  Length Range: {global_stats['min_length']}-{global_stats['max_length']} characters"
-        )
-        print(f"  Average Words: {global_stats['avg_words']:.1f} words")
-        print(
-            f"  Word Range: {global_stats['min_words']}-{global_stats['max_words']} words"
-        )
-        print(
-            f"  Unique Duplicate Sentences: {global_dup_stats['unique_duplicate_sentences']:,}"
-        )
-        print(
-            f"  Total Duplicate Instances: {global_dup_stats['total_duplicate_instances']:,}"
-        )
-        print(
-            f"  Duplicate Percentage: {global_dup_stats['duplicate_percentage']:.2f}%"
-        )
-
-        print("\n  Length Distribution:")
-        for bin_range, count in global_distribution.items():
-            percentage = count / len(global_sentences) * 100
-            print(f"    {bin_range:>10} chars: {count:>6} ({percentage:>5.1f}%)")
+        print_detailed_stats(global_summary)
 
     print("\n" + "=" * 80)
@@ -0,0 +1,212 @@
+"""
+Stage Instrumentation
+
+Shared timing, throughput, memory and profiling support for the pipeline stages.
+Stage entry points are wrapped with @instrumented, and per-language work is recorded
+with record_language. After every stage the run report is rewritten to
+results/run_reports/<run_id>.json so runs can be compared over time. Setting a
+profile mode ("cprofile" or "sampling") also writes per-stage profiles next to it.
+
+Peak memory comes from getrusage, which only reports the largest resident size a
+process has reached so far. Each stage records that lifetime peak and how much it grew
+while the stage ran; a stage that stays below an earlier peak shows no increase, and
+stages running concurrently under --jobs share their increase. Profiles only cover the
+thread that calls the stage entry point, not worker threads or process pools such as
+those of stream_pipeline, generate_statistics and the distributed workers.
+"""
+
+import os
+import sys
+import json
+import time
+import pstats
+import socket
+import cProfile
+import resource
+import platform
+import threading
+import functools
+from collections import Counter
+from datetime import datetime
+from utils import load_config
+
+
+RUN_ID = f"{datetime.now():%Y%m%d_%H%M%S}_{os.getpid()}"
+
+_report = {
+    "run_id": RUN_ID,
+    "started": datetime.now().isoformat(timespec="seconds"),
+    "host": socket.gethostname(),
+    "python": platform.python_version(),
+    "cpu_count": os.cpu_count(),
+    "stages": [],
+}
+_lock = threading.Lock()
+_current = threading.local()
+_settings = {"profile": None, "sampling_interval": 0.005}
+
+
+def configure(profile=None, sampling_interval=None):
+    """Select a profile mode for the following stages: None, "cprofile" or "sampling"."""
+    if profile not in (None, "cprofile", "sampling"):
+        raise ValueError(f"Unknown profile mode: {profile}")
+    _settings["profile"] = profile
+    if sampling_interval is not None:
+        _settings["sampling_interval"] = sampling_interval
+
+
+def peak_rss_mb():
+    """Lifetime peak resident memory of this process and its largest child, in MB."""
+    self_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    children_kb = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    return {"self": self_kb / 1024, "children": children_kb / 1024}
+
+
+class Timer:
+    """Wall and CPU time since creation."""
+
+    def __init__(self):
+        self.wall_start = time.perf_counter()
+        self.cpu_start = time.process_time()
+
+    def elapsed(self):
+        return (
+            time.perf_counter() - self.wall_start,
+            time.process_time() - self.cpu_start,
+        )
+
+
+def record_language(stage_name: str, lang_code: str, timer: Timer, items: int, **counters):
+    """Record the time, throughput and counters of one language within a stage."""
+    wall, cpu = timer.elapsed()
+    entry = {
+        "wall_s": round(wall, 4),
+        "cpu_s": round(cpu, 4),
+        "items": items,
+        "items_per_s": round(items / wall, 3) if wall > 0 else None,
+        "counters": {key: int(value) for key, value in counters.items()},
+    }
+
+    stage_entry = getattr(_current, "stage", None)
+    if stage_entry is None or stage_entry["stage"] != stage_name:
+        stage_entry = {"stage": stage_name, "languages": {}}
+        with _lock:
+            _report["stages"].append(stage_entry)
+    stage_entry["languages"][lang_code] = entry
+
+
+class Sampler:
+    """Sample the stack of one thread at a fixed interval."""
+
+    def __init__(self, thread_id: int, interval: float):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.samples = Counter()
+        self.total = 0
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            seen = set()
+            while frame is not None:
+                code = frame.f_code
+                key = f"{code.co_filename}:{code.co_firstlineno} {code.co_name}"
+                if key not in seen:
+                    self.samples[key] += 1
+                    seen.add(key)
+                frame = frame.f_back
+            self.total += 1
+
+    def start(self):
+        self.thread.start()
+
+    def stop(self, output_path: str, top: int = 50):
+        self.stopped.set()
+        self.thread.join()
+        with open(output_path, "w", encoding="utf-8") as f:
+            f.write(f"{self.total} samples every {self.interval}s\n")
+            f.write("inclusive%  samples  function\n")
+            for key, count in self.samples.most_common(top):
+                f.write(f"{count / max(self.total, 1) * 100:9.1f}%  {count:7d}  {key}\n")
+
+
+def report_dir():
+    return f"{load_config()['directory']['RESULTS_DIR']}/run_reports"
+
+
+def write_report():
+    """Write the run report collected so far."""
+    os.makedirs(report_dir(), exist_ok=True)
+    with _lock:
+        with open(f"{report_dir()}/{RUN_ID}.json", "w", encoding="utf-8") as f:
+            json.dump(_report, f, indent=2)
+
+
+def instrumented(stage_name: str):
+    """Record timing, memory and optional profiles for a stage entry point."""
+
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            lang_codes = kwargs.get("lang_codes")
+            label = stage_name + (f"_{'_'.join(lang_codes)}" if lang_codes else "")
+            stage_entry = {"stage": stage_name, "lang_codes": lang_codes, "languages": {}}
+            _current.stage = stage_entry
+
+            profile = _settings["profile"]
+            profiler = sampler = None
+            if profile == "cprofile":
+                profiler = cProfile.Profile()
+                profiler.enable()
+            elif profile == "sampling":
+                sampler = Sampler(threading.get_ident(), _settings["sampling_interval"])
+                sampler.start()
+
+            start_peak = peak_rss_mb()
+            timer = Timer()
+            status = "ok"
+            try:
+                return func(*args, **kwargs)
+            except BaseException:
+                status = "failed"
+                raise
+            finally:
+                wall, cpu = timer.elapsed()
+                end_peak = peak_rss_mb()
+                _current.stage = None
+                stage_entry.update(
+                    {
+                        "status": status,
+                        "wall_s": round(wall, 4),
+                        "cpu_s": round(cpu, 4),
+                        "process_peak_rss_mb": end_peak,
+                        "peak_rss_increase_mb": {
+                            key: end_peak[key] - start_peak[key] for key in end_peak
+                        },
+                    }
+                )
+
+                if profiler is not None or sampler is not None:
+                    os.makedirs(f"{report_dir()}/{RUN_ID}", exist_ok=True)
+                if profiler is not None:
+                    profiler.disable()
+                    profile_path = f"{report_dir()}/{RUN_ID}/{label}.prof"
+                    profiler.dump_stats(profile_path)
+                    with open(profile_path[: -len(".prof")] + ".txt", "w") as f:
+                        stats = pstats.Stats(profiler, stream=f)
+                        stats.sort_stats("cumulative").print_stats(50)
+                    stage_entry["profile"] = profile_path
+                if sampler is not None:
+                    sample_path = f"{report_dir()}/{RUN_ID}/{label}_samples.txt"
+                    sampler.stop(sample_path)
+                    stage_entry["profile"] = sample_path
+
+                with _lock:
+                    _report["stages"].append(stage_entry)
+                write_report()
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,187 @@
+"""
+Record I/O
+
+Shared JSONL reading and writing for sentence and parallel corpus files. Records are
+streamed in chunks instead of loaded as whole-file lists, writes are buffered, and
+orjson is used when it is installed. Writers can also build a sidecar byte-offset
+index ({file}.idx.json) so single records can be read by (doc_id, sent_id) without
+scanning the file.
+"""
+
+import os
+import json
+
+try:
+    import orjson
+
+    def loads(data):
+        return orjson.loads(data)
+
+    def dumps(record) -> bytes:
+        return orjson.dumps(record)
+
+except ImportError:
+
+    def loads(data):
+        return json.loads(data)
+
+    def dumps(record) -> bytes:
+        return json.dumps(record, ensure_ascii=False).encode("utf-8")
+
+
+def iter_chunks(file_path: str, chunk_size: int = 10_000, digest=None):
+    """Yield the records of a JSONL file in lists of up to chunk_size.
+
+    If a hashlib digest is given, every byte read is also fed to it.
+    """
+    chunk = []
+    with open(file_path, "rb") as f:
+        for line in f:
+            if digest is not None:
+                digest.update(line)
+            if not line.strip():
+                continue
+            chunk.append(loads(line))
+            if len(chunk) >= chunk_size:
+                yield chunk
+                chunk = []
+    if chunk:
+        yield chunk
+
+
+def iter_records(file_path: str, chunk_size: int = 10_000):
+    """Yield the records of a JSONL file one at a time."""
+    for chunk in iter_chunks(file_path, chunk_size):
+        yield from chunk
+
+
+def count_records(file_path: str) -> int:
+    """Count the non-empty lines of a JSONL file without parsing them."""
+    with open(file_path, "rb") as f:
+        return sum(1 for line in f if line.strip())
+
+
+def record_key(record) -> str:
+    """Key used by the offset index."""
+    return f"{record['doc_id']}:{record['sent_id']}"
+
+
+def index_path(file_path: str) -> str:
+    return f"{file_path}.idx.json"
+
+
+class RecordWriter:
+    """Buffered JSONL writer that can build an offset index as it writes."""
+
+    def __init__(self, file_path: str, build_index: bool = False, buffer_size: int = 1_000):
+        self.file_path = file_path
+        self.file = open(file_path, "wb")
+        self.buffer = []
+        self.buffer_size = buffer_size
+        self.offsets = {} if build_index else None
+        self.position = 0
+        self.count = 0
+
+    def write(self, record) -> None:
+        line = dumps(record) + b"\n"
+        if self.offsets is not None:
+            self.offsets[record_key(record)] = self.position
+        self.position += len(line)
+        self.buffer.append(line)
+        self.count += 1
+        if len(self.buffer) >= self.buffer_size:
+            self.flush()
+
+    def write_many(self, records) -> None:
+        for record in records:
+            self.write(record)
+
+    def flush(self) -> None:
+        self.file.write(b"".join(self.buffer))
+        self.buffer.clear()
+        self.file.flush()
+
+    def close(self) -> None:
+        if self.file.closed:
+            return
+        self.flush()
+        self.file.close()
+        if self.offsets is not None:
+            write_index(self.file_path, self.offsets)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def write_index(file_path: str, offsets: dict) -> None:
+    """Write the offset index of a JSONL file, stamped with the file's size and mtime."""
+    file_stat = os.stat(file_path)
+    index = {
+        "size": file_stat.st_size,
+        "mtime_ns": file_stat.st_mtime_ns,
+        "offsets": offsets,
+    }
+    with open(index_path(file_path), "w", encoding="utf-8") as f:
+        json.dump(index, f)
+
+
+def build_index(file_path: str) -> dict:
+    """Scan a JSONL file once and write its offset index."""
+    offsets = {}
+    position = 0
+    with open(file_path, "rb") as f:
+        for line in f:
+            if line.strip():
+                offsets[record_key(loads(line))] = position
+            position += len(line)
+    write_index(file_path, offsets)
+    return offsets
+
+
+class RecordIndex:
+    """Random access to JSONL records by (doc_id, sent_id) through the offset index."""
+
+    def __init__(self, file_path: str):
+        self.file_path = file_path
+        self.offsets = None
+
+        if os.path.exists(index_path(file_path)):
+            with open(index_path(file_path), "r", encoding="utf-8") as f:
+                index = json.load(f)
+            file_stat = os.stat(file_path)
+            if (index["size"], index["mtime_ns"]) == (
+                file_stat.st_size,
+                file_stat.st_mtime_ns,
+            ):
+                self.offsets = index["offsets"]
+
+        # Missing or stale index
+        if self.offsets is None:
+            self.offsets = build_index(file_path)
+        self.file = open(file_path, "rb")
+
+    def __len__(self):
+        return len(self.offsets)
+
+    def __contains__(self, key):
+        return f"{key[0]}:{key[1]}" in self.offsets
+
+    def get(self, doc_id, sent_id):
+        """Return the record with the given doc_id and sent_id, or None."""
+        offset = self.offsets.get(f"{doc_id}:{sent_id}")
+        if offset is None:
+            return None
+        self.file.seek(offset)
+        return loads(self.file.readline())
+
+    def close(self) -> None:
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -8,8 +8,10 @@ parallel data, and results.
 
 from pathlib import Path
 from utils import load_config
+from data_pipeline import instrumentation
 
 
+@instrumentation.instrumented("setup")
 def main():
     config = load_config()
 
@@ -0,0 +1,396 @@
+"""
+Streaming Document Pipeline
+
+This script runs PDF download, PDF conversion and sentence extraction as one
+producer/consumer pipeline instead of three stage-wide passes. Each downloaded PDF
+is handed to conversion and then to sentence extraction through bounded queues, so
+a slow stage applies backpressure to the ones before it. Downloads run on threads
+with one Chrome driver each; conversion and extraction run in their own process
+pools so spaCy, lingua and PyMuPDF work in parallel with the network.
+"""
+
+import os
+import queue
+import shutil
+import threading
+import multiprocessing
+import pandas as pd
+from utils import load_config, select_languages
+from data_pipeline import instrumentation, record_io, dedup_index
+from data_pipeline import convert_pdfs, download_pdfs, extract_sentences
+from concurrent.futures import ProcessPoolExecutor
+
+
+DONE = None
+
+# Models loaded once per worker process by the pool initializers
+_detector = None
+_nlp = None
+
+
+def init_convert_worker():
+    global _detector
+    _detector = convert_pdfs.load_detector()
+
+
+def init_extract_worker():
+    global _nlp, _detector
+    _nlp, _detector = extract_sentences.load_models()
+
+
+def convert_task(pdf_path: str, lang_code: str):
+    return convert_pdfs.convert_pdf(pdf_path, lang_code, _detector)
+
+
+def extract_task(md_text: str, lang_code: str):
+    return extract_sentences.extract_document_sentences(
+        md_text, lang_code, _nlp, _detector
+    )
+
+
+class WorkerLost(Exception):
+    """Raised by a stage when its worker cannot process any further items."""
+
+
+def put(out_queue, item, aborted) -> bool:
+    """Put an item on a bounded queue, giving up if the pipeline is aborted."""
+    while not aborted.is_set():
+        try:
+            out_queue.put(item, timeout=0.5)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+
+def run_workers(
+    stage_name: str,
+    num_workers: int,
+    target,
+    in_queue,
+    aborted,
+    on_error,
+    out_queue=None,
+    out_workers=0,
+):
+    """Start worker threads that stop on DONE and signal the next stage once all stop.
+
+    Errors in an item are passed to on_error and the worker moves on. A worker that
+    raises WorkerLost stops; if every worker of a stage stops that way, the whole
+    pipeline is aborted instead of waiting on a stage that no longer consumes.
+    """
+    remaining = [num_workers]
+    lost = [0]
+    lock = threading.Lock()
+
+    def worker():
+        try:
+            while not aborted.is_set():
+                try:
+                    item = in_queue.get(timeout=0.5)
+                except queue.Empty:
+                    continue
+                if item is DONE:
+                    break
+                try:
+                    target(item)
+                except WorkerLost as e:
+                    on_error(item, e)
+                    with lock:
+                        lost[0] += 1
+                    break
+                except Exception as e:
+                    on_error(item, e)
+        finally:
+            with lock:
+                remaining[0] -= 1
+                if remaining[0] == 0:
+                    if lost[0] == num_workers:
+                        print(f"All {stage_name} workers stopped, aborting")
+                        aborted.set()
+                    for _ in range(out_workers):
+                        put(out_queue, DONE, aborted)
+
+    threads = [threading.Thread(target=worker, daemon=True) for _ in range(num_workers)]
+    for thread in threads:
+        thread.start()
+    return threads
+
+
+@instrumentation.instrumented("stream_pipeline")
+def main(lang_codes=None):
+    config = select_languages(load_config(), lang_codes)
+    stream_config = config["streaming"]
+    directory = config["directory"]
+    queue_size = stream_config["queue_size"]
+
+    timer = instrumentation.Timer()
+    url_queue = queue.Queue(maxsize=queue_size)
+    pdf_queue = queue.Queue(maxsize=queue_size)
+    markdown_queue = queue.Queue(maxsize=queue_size)
+
+    stats = {
+        lang_code: {
+            "Language": lang_config["name"],
+            "Attempted": 0,
+            "Duplicates Skipped": 0,
+            "Already Downloaded": 0,
+            "Skipped at Collection": 0,
+            "Downloaded": 0,
+            "Kept": 0,
+            "Wrong Language": 0,
+            "Errors": 0,
+            "Documents": 0,
+            "Sentences": 0,
+        }
+        for lang_code, lang_config in config["LANGUAGES"].items()
+    }
+    stats_lock = threading.Lock()
+
+    def count(lang_code: str, key: str, amount: int = 1):
+        with stats_lock:
+            stats[lang_code][key] += amount
+
+    # Every queued item starts with its language code
+    aborted = threading.Event()
+
+    def on_error(item, error):
+        print(f"Error processing {item[1]}: {str(error)}")
+        count(item[0], "Errors")
+
+    # Per-language output state
+    sentence_files = {}
+    write_locks = {}
+    for lang_code in config["LANGUAGES"]:
+        os.makedirs(f"{directory['PDFS_DIR']}/{lang_code}", exist_ok=True)
+        os.makedirs(f"{directory['EXTRACTED_DIR']}/{lang_code}", exist_ok=True)
+        sentence_files[lang_code] = record_io.RecordWriter(
+            f"{directory['SENTENCES_DIR']}/{lang_code}_sentences.jsonl",
+            build_index=True,
+        )
+        write_locks[lang_code] = threading.Lock()
+
+    # Stage 1: download PDFs, one Chrome driver per worker thread
+    staging_root = f"{directory['PDFS_DIR']}/.staging"
+    drivers = []
+    local = threading.local()
+
+    def download(item):
+        lang_code, pdf_url = item
+        if not hasattr(local, "driver"):
+            local.staging_dir = f"{staging_root}/worker_{threading.get_ident()}"
+            os.makedirs(local.staging_dir, exist_ok=True)
+            try:
+                local.driver = download_pdfs.setup_pdf_driver(local.staging_dir)
+            except Exception as e:
+                raise WorkerLost(f"could not start Chrome: {str(e)}") from e
+            with stats_lock:
+                drivers.append(local.driver)
+
+        count(lang_code, "Attempted")
+        try:
+            known_files = set(os.listdir(local.staging_dir))
+            local.driver.get(pdf_url)
+            staged_path = download_pdfs.wait_for_download(
+                local.staging_dir, known_files, stream_config["download_timeout"]
+            )
+        except Exception:
+            staged_path = None
+        if staged_path is None:
+            return
+
+        pdf_path = f"{directory['PDFS_DIR']}/{lang_code}/{os.path.basename(staged_path)}"
+        shutil.move(staged_path, pdf_path)
+        count(lang_code, "Downloaded")
+        dedup_index.mark_downloaded(config, None, pdf_url)
+        put(pdf_queue, (lang_code, pdf_path), aborted)
+
+    # Pool workers start on first use, when download threads are already running, so
+    # spawn them instead of forking a multi-threaded process
+    mp_context = multiprocessing.get_context("spawn")
+
+    # Stage 2: convert to markdown and verify the language in a process pool
+    convert_pool = ProcessPoolExecutor(
+        max_workers=stream_config["convert_workers"],
+        mp_context=mp_context,
+        initializer=init_convert_worker,
+    )
+    doc_numbers = {lang_code: 0 for lang_code in config["LANGUAGES"]}
+
+    def convert(item):
+        lang_code, pdf_path = item
+        try:
+            md_text = convert_pool.submit(convert_task, pdf_path, lang_code).result()
+        except Exception as e:
+            print(f"Error converting PDF to markdown: {str(e)}")
+            os.remove(pdf_path)
+            count(lang_code, "Errors")
+            return
+
+        if md_text is None:
+            os.remove(pdf_path)
+            count(lang_code, "Wrong Language")
+            return
+
+        with stats_lock:
+            doc_numbers[lang_code] += 1
+            doc_number = doc_numbers[lang_code]
+        doc_id = convert_pdfs.save_document(
+            md_text,
+            pdf_path,
+            doc_number,
+            f"{directory['PDFS_DIR']}/{lang_code}",
+            f"{directory['EXTRACTED_DIR']}/{lang_code}",
+        )
+        count(lang_code, "Kept")
+        put(markdown_queue, (lang_code, doc_id, md_text), aborted)
+
+    # Stage 3: extract sentences in a process pool and append them as they arrive
+    extract_pool = ProcessPoolExecutor(
+        max_workers=stream_config["extract_workers"],
+        mp_context=mp_context,
+        initializer=init_extract_worker,
+    )
+
+    def extract(item):
+        lang_code, doc_id, md_text = item
+        target_sentences = config["LANGUAGES"][lang_code]["target_sentences"]
+        try:
+            sentences = extract_pool.submit(extract_task, md_text, lang_code).result()
+        except Exception as e:
+            print(f"Error when extracting sentences: {str(e)}")
+            return
+
+        with write_locks[lang_code]:
+            remaining = target_sentences - stats[lang_code]["Sentences"]
+            sentences = sentences[: max(remaining, 0)]
+            out_file = sentence_files[lang_code]
+            for idx, sentence in enumerate(sentences):
+                data = {
+                    "text": sentence,
+                    "lang": lang_code,
+                    "doc_id": doc_id,
+                    "sent_id": idx,
+                }
+                out_file.write(data)
+            out_file.flush()
+            if sentences:
+                count(lang_code, "Documents")
+                count(lang_code, "Sentences", len(sentences))
+
+    threads = []
+    threads += run_workers(
+        "download",
+        stream_config["download_workers"],
+        download,
+        url_queue,
+        aborted,
+        on_error,
+        pdf_queue,
+        stream_config["convert_workers"],
+    )
+    threads += run_workers(
+        "convert",
+        stream_config["convert_workers"],
+        convert,
+        pdf_queue,
+        aborted,
+        on_error,
+        markdown_queue,
+        stream_config["extract_workers"],
+    )
+    threads += run_workers(
+        "extract",
+        stream_config["extract_workers"],
+        extract,
+        markdown_queue,
+        aborted,
+        on_error,
+    )
+
+    # PDFs from earlier runs are converted again, like convert_pdfs does, so only
+    # their download is skipped. They are listed before any download starts and fed
+    # from their own thread, so new downloads are interleaved with them instead of
+    # waiting until the whole backlog is converted.
+    old_pdfs = [
+        (lang_code, f"{directory['PDFS_DIR']}/{lang_code}/{pdf_name}")
+        for lang_code in config["LANGUAGES"]
+        for pdf_name in sorted(os.listdir(f"{directory['PDFS_DIR']}/{lang_code}"))
+        if pdf_name.endswith(".pdf")
+    ]
+
+    def feed_old_pdfs():
+        for item in old_pdfs:
+            if not put(pdf_queue, item, aborted):
+                break
+
+    backlog_thread = threading.Thread(target=feed_old_pdfs, daemon=True)
+
+    # Feed metadata rows, blocking while the download queue is full
+    try:
+        backlog_thread.start()
+        for lang_code in config["LANGUAGES"]:
+            metadata_path = f"{directory['METADATA_DIR']}/{lang_code}_article_data.csv"
+            if not os.path.exists(metadata_path):
+                print(f"No metadata found for {lang_code}, skipping")
+                continue
+            articles_df, skipped = dedup_index.filter_metadata(
+                config, lang_code, pd.read_csv(metadata_path)
+            )
+            count(lang_code, "Duplicates Skipped", skipped["duplicates"])
+            count(lang_code, "Already Downloaded", skipped["already_downloaded"])
+            count(lang_code, "Skipped at Collection", skipped["skipped_at_collection"])
+            for pdf_url in articles_df["pdf_url"]:
+                if not put(url_queue, (lang_code, pdf_url), aborted):
+                    break
+
+        # Download workers pass DONE on to conversion, so finish the backlog first
+        backlog_thread.join()
+        for _ in range(stream_config["download_workers"]):
+            put(url_queue, DONE, aborted)
+
+        for thread in threads:
+            thread.join()
+        if aborted.is_set():
+            raise RuntimeError("Streaming pipeline aborted: a stage lost all its workers")
+    finally:
+        aborted.set()
+        for driver in drivers:
+            driver.quit()
+        convert_pool.shutdown()
+        extract_pool.shutdown()
+        for out_file in sentence_files.values():
+            out_file.close()
+        shutil.rmtree(staging_root, ignore_errors=True)
+
+    for lang_code, lang_stats in stats.items():
+        instrumentation.record_language(
+            "stream_pipeline",
+            lang_code,
+            timer,
+            items=lang_stats["Attempted"],
+            **{
+                key.lower().replace(" ", "_"): value
+                for key, value in lang_stats.items()
+                if key not in ("Language", "Attempted")
+            },
+        )
+
+    # Every article skipped here saves a download. Only skipped duplicates also save
+    # a conversion, since PDFs from earlier runs are converted again, and articles
+    # skipped at collection were never queued, so they save nothing here.
+    total_saved = sum(
+        s["Duplicates Skipped"] + s["Already Downloaded"] for s in stats.values()
+    )
+    total_conversions = sum(
+        round(s["Duplicates Skipped"] * s["Downloaded"] / s["Attempted"])
+        for s in stats.values()
+        if s["Attempted"]
+    )
+    print("Streaming Pipeline Summary:")
+    print(pd.DataFrame(list(stats.values())))
+    print(
+        f"Skipped {total_saved} duplicate or already downloaded articles, saving "
+        f"{total_saved} downloads and about {total_conversions} conversions"
+    )
+    print()
@@ -1,36 +1,441 @@
 """
 Main Pipeline Runner
 
-Edit SCRIPTS_TO_RUN below to select which scripts to execute.
+Runs the corpus pipeline as a dependency graph of stages. Each stage declares the
+files it reads and writes per language; a stage is skipped for a language when its
+outputs exist and its inputs match the fingerprint recorded after its last run.
+
+Usage:
+    python main.py                           # build everything up to finalize_corpus
+    python main.py extract_sentences         # build up to sentence extraction
+    python main.py --langs vi ta --jobs 2    # only some languages, two at a time
+    python main.py --force convert_pdfs      # rerun even if up to date
+    python main.py generate_statistics       # sentence statistics
+    python main.py --stream                  # stream download -> convert -> extract
+    python main.py --workers 4               # convert and extract with 4 leased workers
+    python main.py --profile cprofile        # also write per-stage profiles
+
+Every run writes a timing, throughput and memory report to results/run_reports/.
 """
 
-from data_pipeline import (
-    setup,
-    collect_metadata,
-    convert_pdfs,
-    download_pdfs,
-    extract_sentences,
-    generate_statistics,
-    backtranslate,
-    # finalize_corpus,
-)
+import os
+import json
+import hashlib
+import argparse
+import importlib
+import importlib.util
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from utils import load_config, SPLITS
+from data_pipeline import instrumentation
+
+
+def lang_paths(config: dict, lang_code: str) -> dict:
+    """Return the data paths a language moves through."""
+    directory = config["directory"]
+    return {
+        "metadata": f"{directory['METADATA_DIR']}/{lang_code}_article_data.csv",
+        "pdfs": f"{directory['PDFS_DIR']}/{lang_code}",
+        "extracted": f"{directory['EXTRACTED_DIR']}/{lang_code}",
+        "sentences": f"{directory['SENTENCES_DIR']}/{lang_code}_sentences.jsonl",
+        "parallel": f"{directory['PARALLEL_DATA_DIR']}/{lang_code}-en_data.jsonl",
+        "splits": [
+            f"{directory['PARALLEL_DATA_DIR']}/{lang_code}-en_{split}.jsonl"
+            for split in SPLITS
+        ],
+        "export": [
+            f"{directory['EXPORT_DIR']}/{lang_code}-en_{split}/index.json"
+            for split in SPLITS
+        ],
+    }
+
+
+def all_langs(config, langs, key):
+    """Collect one path entry across several languages."""
+    paths = []
+    for lang_code in langs:
+        value = lang_paths(config, lang_code)[key]
+        paths.extend(value if isinstance(value, list) else [value])
+    return paths
+
+
+# Stages in pipeline order, named after their data_pipeline modules, which are only
+# imported when the stage runs. Per-language stages run once per language and depend
+# on the same language in the previous stage; other stages see all selected languages.
+# Report-only stages print results instead of writing files, so they always run, and
+# "config" lists the dotted config keys a stage reads, which go into its fingerprint.
+# Grouped stages are checked per language, but all out-of-date languages run in one
+# call once every language is ready, so backtranslate submits its batches together.
+STAGES = {
+    "setup": {
+        "after": [],
+        "per_language": False,
+        "inputs": lambda config, langs: [],
+        "outputs": lambda config, langs: list(config["directory"].values()),
+    },
+    "collect_metadata": {
+        "after": ["setup"],
+        "per_language": True,
+        "inputs": lambda config, langs: [],
+        "outputs": lambda config, langs: all_langs(config, langs, "metadata"),
+    },
+    "download_pdfs": {
+        "after": ["collect_metadata"],
+        "per_language": True,
+        "inputs": lambda config, langs: all_langs(config, langs, "metadata"),
+        "outputs": lambda config, langs: all_langs(config, langs, "pdfs"),
+    },
+    "convert_pdfs": {
+        "after": ["download_pdfs"],
+        "per_language": True,
+        "inputs": lambda config, langs: all_langs(config, langs, "pdfs"),
+        "outputs": lambda config, langs: all_langs(config, langs, "extracted"),
+    },
+    "extract_sentences": {
+        "after": ["convert_pdfs"],
+        "per_language": True,
+        "inputs": lambda config, langs: all_langs(config, langs, "extracted"),
+        "outputs": lambda config, langs: all_langs(config, langs, "sentences"),
+    },
+    "generate_statistics": {
+        "after": ["extract_sentences"],
+        "per_language": False,
+        "report_only": True,
+        "config": ["statistics"],
+        "inputs": lambda config, langs: all_langs(config, langs, "sentences"),
+        "outputs": lambda config, langs: [],
+    },
+    "backtranslate": {
+        "after": ["extract_sentences"],
+        "per_language": True,
+        "grouped": True,
+        "config": ["data_processing.back_translation"],
+        "inputs": lambda config, langs: all_langs(config, langs, "sentences"),
+        "outputs": lambda config, langs: all_langs(config, langs, "parallel"),
+    },
+    "finalize_corpus": {
+        "after": ["backtranslate"],
+        "per_language": False,
+        "config": [
+            "data_processing.train_val_test_split",
+            "data_processing.length_buckets",
+            "project.seed",
+        ],
+        "inputs": lambda config, langs: all_langs(config, langs, "parallel"),
+        "outputs": lambda config, langs: all_langs(config, langs, "splits"),
+    },
+    "export_corpus": {
+        "after": ["finalize_corpus"],
+        "per_language": True,
+        "config": ["data_processing.export", "project.seed"],
+        "inputs": lambda config, langs: all_langs(config, langs, "splits"),
+        "outputs": lambda config, langs: all_langs(config, langs, "export"),
+    },
+}
+
+
+# Stages the streaming pipeline runs together, per document
+STREAMED_STAGES = ("download_pdfs", "convert_pdfs", "extract_sentences")
+
+# Stages that can be split between lease-based worker processes
+DISTRIBUTED_STAGES = ("convert_pdfs", "extract_sentences")
+
+
+def stage_module(stage_name: str):
+    """Import a stage's module on first use."""
+    return importlib.import_module(f"data_pipeline.{stage_name}")
+
+
+def fingerprint(paths, extra: str = "") -> str:
+    """Hash the names, sizes and modification times of files under the given paths."""
+    digest = hashlib.blake2b(extra.encode("utf-8"), digest_size=16)
+    for path in sorted(paths):
+        if os.path.isdir(path):
+            files = sorted(
+                os.path.join(root, name)
+                for root, _, names in os.walk(path)
+                for name in names
+            )
+        else:
+            files = [path] if os.path.exists(path) else []
+
+        digest.update(f"{path}\0".encode("utf-8"))
+        for file_path in files:
+            file_stat = os.stat(file_path)
+            digest.update(
+                f"{file_path}:{file_stat.st_size}:{file_stat.st_mtime_ns}\0".encode(
+                    "utf-8"
+                )
+            )
+    return digest.hexdigest()
+
+
+def config_value(config: dict, key: str):
+    """Look up a dotted config key such as "data_processing.export"."""
+    value = config
+    for part in key.split("."):
+        value = value[part]
+    return value
+
+
+def stage_fingerprint(config: dict, stage_name: str, langs) -> str:
+    """Fingerprint a stage's inputs, source code and relevant configuration."""
+    stage = STAGES[stage_name]
+    source_path = importlib.util.find_spec(f"data_pipeline.{stage_name}").origin
+    with open(source_path, "rb") as f:
+        source_hash = hashlib.blake2b(f.read(), digest_size=16).hexdigest()
+    settings = json.dumps(
+        {
+            "languages": {lang: config["LANGUAGES"][lang] for lang in langs},
+            "config": {
+                key: config_value(config, key) for key in stage.get("config", [])
+            },
+            "source": source_hash,
+        },
+        sort_keys=True,
+    )
+    return fingerprint(stage["inputs"](config, langs), settings)
+
+
+def outputs_exist(config: dict, stage_name: str, langs) -> bool:
+    """Check that every output of a stage exists and directories are not empty."""
+    for path in STAGES[stage_name]["outputs"](config, langs):
+        if not os.path.exists(path):
+            return False
+        if os.path.isdir(path) and not os.listdir(path) and stage_name != "setup":
+            return False
+    return True
+
+
+def plan(targets, langs):
+    """Expand targets to (stage, language) nodes and their dependencies."""
+    needed = []
+    pending = list(targets)
+    while pending:
+        stage_name = pending.pop()
+        if stage_name not in needed:
+            needed.append(stage_name)
+            pending.extend(STAGES[stage_name]["after"])
+
+    nodes = {}
+    for stage_name in STAGES:
+        if stage_name not in needed:
+            continue
+        stage = STAGES[stage_name]
+        node_langs = langs if stage["per_language"] else [None]
+
+        for lang_code in node_langs:
+            deps = []
+            for dep_name in stage["after"]:
+                if STAGES[dep_name]["per_language"]:
+                    dep_langs = [lang_code] if lang_code else langs
+                    deps.extend((dep_name, dep_lang) for dep_lang in dep_langs)
+                else:
+                    deps.append((dep_name, None))
+            nodes[(stage_name, lang_code)] = deps
+    return nodes
+
+
+def node_name(node) -> str:
+    stage_name, lang_code = node
+    return f"{stage_name}:{lang_code}" if lang_code else stage_name
+
+
+def state_key(node, langs) -> str:
+    """Key of a node's run state, naming the languages an all-language node covered."""
+    stage_name, lang_code = node
+    return node_name(node) if lang_code else f"{stage_name}:{'+'.join(sorted(langs))}"
+
+
+def run_pipeline(
+    targets,
+    langs,
+    jobs: int = 1,
+    force: bool = False,
+    dry_run: bool = False,
+    stream: bool = False,
+    workers: int = 0,
+):
+    """Run the targets and their dependencies, skipping nodes that are up to date."""
+    config = load_config()
+    state_path = f"{config['directory']['DATA_DIR']}/pipeline_state.json"
+    state = {}
+    if os.path.exists(state_path):
+        with open(state_path, "r", encoding="utf-8") as f:
+            state = json.load(f)
+    state_lock = threading.Lock()
+
+    nodes = plan(targets, langs)
+    done, failed = set(), set()
+    streamed = set()
+    results = []
+
+    def node_langs(node):
+        return [node[1]] if node[1] else langs
+
+    def is_up_to_date(node):
+        stage_name = node[0]
+        return state.get(state_key(node, langs)) == stage_fingerprint(
+            config, stage_name, node_langs(node)
+        ) and outputs_exist(config, stage_name, node_langs(node))
+
+    def run_nodes(group):
+        """Run the nodes of one stage in a single call, returning each node's status."""
+        node = group[0]
+        stage_name = node[0]
+        report_only = STAGES[stage_name].get("report_only", False)
+        stale = [n for n in group if force or report_only or not is_up_to_date(n)]
+        statuses = {n: "up to date" for n in group if n not in stale}
+        if not stale:
+            return statuses
+        if dry_run:
+            return {**statuses, **{n: "would run" for n in stale}}
+
+        stale_langs = [lang for n in stale for lang in node_langs(n)]
+        kwargs = {} if stage_name in ("setup", "generate_statistics") else {
+            "lang_codes": stale_langs
+        }
+        if stream and stage_name == STREAMED_STAGES[0]:
+            stage_module("stream_pipeline").main(**kwargs)
+            streamed.add(node[1])
+        elif stream and stage_name in STREAMED_STAGES and node[1] in streamed:
+            pass
+        elif workers and stage_name in DISTRIBUTED_STAGES:
+            stage_module("distributed").launch(stage_name, workers=workers, **kwargs)
+        else:
+            stage_module(stage_name).main(**kwargs)
+
+        # Record inputs as they are after the run, since some stages rewrite them
+        with state_lock:
+            for n in stale:
+                state[state_key(n, langs)] = stage_fingerprint(
+                    config, stage_name, node_langs(n)
+                )
+            with open(state_path, "w", encoding="utf-8") as f:
+                json.dump(state, f, indent=2, sort_keys=True)
+        return {**statuses, **{n: "ran" for n in stale}}
+
+    with ThreadPoolExecutor(max_workers=jobs) as executor:
+        running = {}
+        while len(done) + len(failed) < len(nodes):
+            scheduled = {node for group in running.values() for node in group}
+            ready = []
+            for node, deps in nodes.items():
+                if node in done or node in failed or node in scheduled:
+                    continue
+                if any(dep in failed for dep in deps):
+                    failed.add(node)
+                    results.append((node_name(node), "skipped (dependency failed)"))
+                elif all(dep in done for dep in deps):
+                    ready.append(node)
+
+            # Grouped stages wait until none of their languages is still blocked
+            waiting = {
+                node[0]
+                for node in nodes
+                if node not in done
+                and node not in failed
+                and node not in scheduled
+                and node not in ready
+            }
+            for stage_name in dict.fromkeys(node[0] for node in ready):
+                stage_nodes = [node for node in ready if node[0] == stage_name]
+                if not STAGES[stage_name].get("grouped"):
+                    groups = [(node,) for node in stage_nodes]
+                elif stage_name in waiting:
+                    groups = []
+                else:
+                    groups = [tuple(stage_nodes)]
+                for group in groups:
+                    running[executor.submit(run_nodes, group)] = group
+
+            if not running:
+                continue
+
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                group = running.pop(future)
+                try:
+                    statuses = future.result()
+                    for node in group:
+                        results.append((node_name(node), statuses[node]))
+                        done.add(node)
+                except Exception as e:
+                    for node in group:
+                        results.append((node_name(node), f"failed: {str(e)}"))
+                        failed.add(node)
+
+    print("\nPipeline Summary:")
+    for name, status in results:
+        print(f"  {name:<30} {status}")
+    if not dry_run:
+        instrumentation.write_report()
+        print(f"\nRun report: {instrumentation.report_dir()}/{instrumentation.RUN_ID}.json")
+    return not failed
 
 
-def build_corpus():
-    print("Generating corpus")
-    # setup.main()
-    # collect_metadata.main()
-    # download_pdfs.main()
-    # convert_pdfs.main()
-    # extract_sentences.main()
-    backtranslate.main()
-    # finalize_corpus.main()
+def main():
+    config = load_config()
+    parser = argparse.ArgumentParser(description="Build the parallel corpus")
+    parser.add_argument(
+        "targets",
+        nargs="*",
+        metavar="stage",
+        help=f"stages to build with their dependencies: {', '.join(STAGES)} "
+        "(default: finalize_corpus)",
+    )
+    parser.add_argument(
+        "--langs",
+        nargs="+",
+        default=list(config["LANGUAGES"]),
+        choices=list(config["LANGUAGES"]),
+        help="language codes to process",
+    )
+    parser.add_argument(
+        "--jobs", type=int, default=1, help="number of languages to run concurrently"
+    )
+    parser.add_argument(
+        "--force", action="store_true", help="rerun stages even if up to date"
+    )
+    parser.add_argument(
+        "--dry-run", action="store_true", help="show what would run without running it"
+    )
+    parser.add_argument(
+        "--profile",
+        choices=["cprofile", "sampling"],
+        help="write a cProfile or sampling profile for every stage that runs",
+    )
+    parser.add_argument(
+        "--stream",
+        action="store_true",
+        help="download, convert and extract each document as one streaming pipeline",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=0,
+        help="split convert_pdfs and extract_sentences between this many local "
+        "worker processes (see data_pipeline/distributed.py for multiple hosts)",
+    )
+    args = parser.parse_args()
 
+    unknown = [target for target in args.targets if target not in STAGES]
+    if unknown:
+        parser.error(f"unknown stage(s): {', '.join(unknown)}")
 
-def analyze():
-    generate_statistics.main()
+    targets = args.targets or ["finalize_corpus"]
+    instrumentation.configure(profile=args.profile)
+    ok = run_pipeline(
+        targets,
+        args.langs,
+        args.jobs,
+        args.force,
+        args.dry_run,
+        args.stream,
+        args.workers,
+    )
+    raise SystemExit(0 if ok else 1)
 
 
 if __name__ == "__main__":
-    build_corpus()
-    # analyze()
+    main()
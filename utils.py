@@ -1,7 +1,65 @@
+import functools
 import yaml
 
 
-def load_config():
-    with open("config.yaml") as f:
+SPLITS = ("train", "val", "test")
+
+REQUIRED_KEYS = {
+    "project": ["seed"],
+    "LANGUAGES": [],
+    "directory": [
+        "DATA_DIR",
+        "METADATA_DIR",
+        "PDFS_DIR",
+        "EXTRACTED_DIR",
+        "SENTENCES_DIR",
+        "API_QUERIES_DIR",
+        "PARALLEL_DATA_DIR",
+        "EXPORT_DIR",
+        "RESULTS_DIR",
+    ],
+    "data_processing": ["back_translation", "train_val_test_split"],
+    "statistics": ["workers", "chunk_size", "duplicate_mode"],
+    "streaming": ["download_workers", "convert_workers", "extract_workers"],
+    "distributed": ["workers", "lease_timeout", "heartbeat_interval", "poll_interval"],
+}
+
+
+def validate_config(config):
+    """Raise ValueError listing any required config keys that are missing."""
+    missing = []
+    for section, keys in REQUIRED_KEYS.items():
+        if section not in config:
+            missing.append(section)
+            continue
+        missing.extend(f"{section}.{key}" for key in keys if key not in config[section])
+
+    for lang_code, lang_config in config.get("LANGUAGES", {}).items():
+        for key in ("name", "max_articles", "target_sentences"):
+            if key not in lang_config:
+                missing.append(f"LANGUAGES.{lang_code}.{key}")
+
+    if missing:
+        raise ValueError(f"config.yaml is missing: {', '.join(missing)}")
+
+
+@functools.lru_cache(maxsize=None)
+def load_config(path="config.yaml"):
+    """Parse and validate the config once per process; treat the result as read-only."""
+    with open(path) as f:
         config = yaml.safe_load(f)
+    validate_config(config)
     return config
+
+
+def select_languages(config, lang_codes=None):
+    """Return a copy of the config restricted to the given language codes."""
+    if lang_codes is None:
+        return config
+
+    languages = {
+        lang_code: lang_config
+        for lang_code, lang_config in config["LANGUAGES"].items()
+        if lang_code in lang_codes
+    }
+    return {**config, "LANGUAGES": languages}